@@ -0,0 +1,62 @@
+"""
+CBOR against JSON: payload size and encode/decode time of menus and forms.
+
+Encoding times include ``as_data()`` for both formats. ``cbor2`` is used when
+installed, the pure Python codec is timed as well.
+
+Usage: PYTHONPATH=. python benchmarks/cbor.py
+"""
+import json
+import timeit
+
+from onem import Response, cbor, forms
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (10, 100, 1000)
+
+
+def build_menu(size):
+    body = [MenuItem(f'Item {i}', f'/items/{i}', text_search=f'item {i}')
+            for i in range(size)]
+    return Response(Menu(body, header='header', footer='footer'))
+
+
+def build_form(size):
+    body = [forms.IntFormItem(f'int{i}', label='Age', min_value=12)
+            for i in range(size)]
+    return Response(forms.Form(body, '/callback'))
+
+
+def timed(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    accelerated = 'cbor2' if cbor.cbor2 is not None else 'not installed'
+    print(f'cbor2: {accelerated}\n')
+    print(f'{"case":<12} {"json B":>8} {"cbor B":>8} {"json enc":>9} '
+          f'{"cbor enc":>9} {"py enc":>9} {"json dec":>9} {"cbor dec":>9} '
+          f'{"py dec":>9}  (us)')
+    for name, build in (('menu', build_menu), ('form', build_form)):
+        for size in SIZES:
+            response = build(size)
+            as_json = response.as_json_bytes()
+            as_cbor = response.as_cbor()
+            number = max(10, 5000 // size)
+
+            times = [
+                timed(response.as_json_bytes, number),
+                timed(response.as_cbor, number),
+                timed(lambda: cbor.py_dumps(response.as_data()), number),
+                timed(lambda: json.loads(as_json), number),
+                timed(lambda: cbor.loads(as_cbor), number),
+                timed(lambda: cbor.py_loads(as_cbor), number),
+            ]
+            print(f'{f"{name}[{size}]":<12} {len(as_json):>8} '
+                  f'{len(as_cbor):>8} ' +
+                  ' '.join(f'{t:>9.1f}' for t in times))
+
+
+if __name__ == '__main__':
+    main()
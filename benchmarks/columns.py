@@ -0,0 +1,54 @@
+"""
+Building and encoding a Menu with ``Menu.from_columns()`` against one
+MenuItem per row.
+
+Usage: PYTHONPATH=. python benchmarks/columns.py
+"""
+import timeit
+
+from onem import Response, encoders
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (100, 1000, 10000)
+
+
+def rows(size):
+    labels = [f'Product {i}' for i in range(size)]
+    urls = [f'/products/{i}' for i in range(size)]
+    methods = ['post'] * size
+    text_search = [f'product {i}' for i in range(size)]
+    return labels, urls, methods, text_search
+
+
+def per_object(labels, urls, methods, text_search):
+    body = [MenuItem(label, url, method=method, text_search=search)
+            for label, url, method, search
+            in zip(labels, urls, methods, text_search)]
+    return encoders.encode(Response(Menu(body)))
+
+
+def columnar(labels, urls, methods, text_search):
+    return encoders.encode(Response(Menu.from_columns(
+        labels, urls=urls, methods=methods, text_search=text_search)))
+
+
+def main():
+    print(f'{"items":>6} {"objects (us)":>13} {"columns (us)":>13} '
+          f'{"speedup":>8}')
+    for size in SIZES:
+        columns = rows(size)
+        assert per_object(*columns) == columnar(*columns)
+        number = max(5, 10000 // size)
+
+        before = min(timeit.repeat(lambda: per_object(*columns),
+                                   number=number, repeat=5)) / number
+        after = min(timeit.repeat(lambda: columnar(*columns),
+                                  number=number, repeat=5)) / number
+
+        print(f'{size:>6} {before * 1e6:>13.1f} {after * 1e6:>13.1f} '
+              f'{before / after:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+CPU time per gzip compressed response: encoding and compressing on every
+request against the cached encoding of a frozen response.
+
+Usage: PYTHONPATH=. python benchmarks/compression.py
+"""
+import timeit
+
+from onem import Response, compression
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (10, 100, 1000)
+
+
+def build(size):
+    body = [MenuItem(f'Item {i}', f'/items/{i}', text_search=f'item {i}')
+            for i in range(size)]
+    return Response(Menu(body, header='header', footer='footer'))
+
+
+def main():
+    print(f'{"items":>6} {"bytes":>8} {"gzip":>7} {"compress (us)":>14} '
+          f'{"cached (us)":>12} {"speedup":>8}')
+    for size in SIZES:
+        response = build(size)
+        frozen_response = response.freeze()
+        number = max(10, 10000 // size)
+
+        before = min(timeit.repeat(
+            lambda: compression.negotiate_payload(response, 'gzip'),
+            number=number, repeat=5)) / number
+        after = min(timeit.repeat(
+            lambda: compression.negotiate_payload(frozen_response, 'gzip'),
+            number=number, repeat=5)) / number
+
+        print(f'{size:>6} {len(response.as_json_bytes()):>8} '
+              f'{compression.content_length(response, "gzip"):>7} '
+              f'{before * 1e6:>14.1f} {after * 1e6:>12.2f} '
+              f'{before / after:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compiled encoders (``onem.encoders.encode``) against
+``json.dumps(obj.as_data())``.
+
+Usage: PYTHONPATH=. python benchmarks/encoders.py
+"""
+import json
+import timeit
+
+from onem import Response, encoders, forms
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (10, 100, 1000)
+
+
+def build_menu(size):
+    body = [MenuItem(f'Item {i}', f'/items/{i}', text_search=f'item {i}')
+            for i in range(size)]
+    return Response(Menu(body, header='header', footer='footer'))
+
+
+def build_form(size):
+    items = []
+    for i in range(size):
+        items.append(forms.StringFormItem(f'name{i}', label='Name',
+                                          min_length=2))
+        items.append(forms.MenuFormItem(f'poll{i}', [
+            forms.MenuItemFormItem('Yes', 'yes'),
+            forms.MenuItemFormItem('No', 'no'),
+        ]))
+    return Response(forms.Form(items, '/callback'))
+
+
+def main():
+    print(f'{"payload":>12} {"as_data (us)":>13} {"compiled (us)":>14} '
+          f'{"speedup":>8}')
+    for name, build in (('menu', build_menu), ('form', build_form)):
+        for size in SIZES:
+            response = build(size)
+            assert encoders.encode(response) == response.as_json(
+                backend='json')
+            number = max(10, 10000 // size)
+
+            before = min(timeit.repeat(lambda: json.dumps(response.as_data()),
+                                       number=number, repeat=5)) / number
+            after = min(timeit.repeat(lambda: encoders.encode(response),
+                                      number=number, repeat=5)) / number
+
+            print(f'{name + " " + str(size):>12} {before * 1e6:>13.1f} '
+                  f'{after * 1e6:>14.1f} {before / after:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Bytes per item of the slotted menu and form item classes against the same
+attributes held in a plain ``__dict__`` instance.
+
+Usage: PYTHONPATH=. python benchmarks/memory.py
+"""
+import tracemalloc
+
+from onem import forms, menus
+
+
+COUNT = 10000
+
+
+def slots_of(cls):
+    for klass in cls.__mro__:
+        yield from getattr(klass, '__slots__', ())
+
+
+def unslotted(obj, cls):
+    plain = cls()
+    for name in slots_of(obj.__class__):
+        setattr(plain, name, getattr(obj, name))
+    return plain
+
+
+def measure(factory):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [factory() for _ in range(COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / COUNT
+
+
+FACTORIES = {
+    'MenuItem': lambda: menus.MenuItem('label', '/path', text_search='txt'),
+    'MenuItemFormItem': lambda: forms.MenuItemFormItem('label', 'value'),
+    'MenuMeta': lambda: menus.MenuMeta(),
+    'StringFormItem': lambda: forms.StringFormItem('name', min_length=1),
+    'IntFormItem': lambda: forms.IntFormItem('name', min_value=1),
+    'HiddenFormItem': lambda: forms.HiddenFormItem('name', 'value'),
+    'MenuFormItemMeta': lambda: forms.MenuFormItemMeta(),
+    'FormMeta': lambda: forms.FormMeta(),
+}
+
+
+def main():
+    print(f'{"class":>18} {"__dict__ (B)":>13} {"slots (B)":>10} '
+          f'{"saved":>7}')
+    for name, factory in FACTORIES.items():
+        template = factory()
+        # a fresh class per item type keeps the instance dicts key-sharing
+        plain_cls = type(f'Unslotted{name}', (object,), {})
+        before = measure(lambda: unslotted(template, plain_cls))
+        after = measure(factory)
+        print(f'{name:>18} {before:>13.0f} {after:>10.0f} '
+              f'{(1 - after / before) * 100:>6.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Per-request cost of ``Response.as_json()`` with the stdlib backend against
+the previous behaviour which serialized the wrapped object twice.
+
+Usage: PYTHONPATH=. python benchmarks/response.py
+"""
+import json
+import timeit
+
+from onem import Response
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (10, 100, 1000)
+
+
+def build_menu(size):
+    body = [MenuItem(f'Item {i}', f'/items/{i}', text_search=f'item {i}')
+            for i in range(size)]
+    return Menu(body, header='header', footer='footer')
+
+
+def double_pass(response):
+    data = {
+        'content_type': response.object.as_data()['type'],
+        'content': response.object.as_data()
+    }
+    return json.dumps(data)
+
+
+def main():
+    print(f'{"items":>6} {"before (us)":>12} {"after (us)":>12} {"saved":>7}')
+    for size in SIZES:
+        response = Response(build_menu(size))
+        number = max(10, 10000 // size)
+
+        before = min(timeit.repeat(lambda: double_pass(response),
+                                   number=number, repeat=5)) / number
+        after = min(timeit.repeat(lambda: response.as_json(backend='json'),
+                                  number=number, repeat=5)) / number
+
+        print(f'{size:>6} {before * 1e6:>12.1f} {after * 1e6:>12.1f} '
+              f'{(1 - after / before) * 100:>6.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+``SearchIndex.narrow()`` against a linear scan over pre-tokenized items.
+
+Usage: PYTHONPATH=. python benchmarks/search.py
+"""
+import random
+import timeit
+
+from onem.menus import Menu, MenuItem
+from onem.search import SearchIndex, tokenize
+
+
+SIZES = (1000, 10000, 100000)
+
+WORDS = ('apple', 'banana', 'cherry', 'chocolate', 'coffee', 'milk', 'bread',
+         'butter', 'cheese', 'yoghurt', 'orange', 'juice', 'water', 'tea',
+         'rice', 'pasta', 'tomato', 'sauce', 'sugar', 'salt')
+
+QUERIES = ('choc milk', 'ban', 'orange juice 123', 'zzz')
+
+
+def build_menu(size):
+    rnd = random.Random(size)
+    body = [MenuItem(' '.join(rnd.sample(WORDS, 3)) + f' {i}', f'/p/{i}')
+            for i in range(size)]
+    return Menu(body)
+
+
+def linear_scan(menu, tokenized, query):
+    query_tokens = tokenize(query)
+    body = [item for item, tokens in zip(menu.body, tokenized)
+            if all(any(t.startswith(q) for t in tokens)
+                   for q in query_tokens)]
+    return Menu(body, header=menu.header, footer=menu.footer, meta=menu.meta)
+
+
+def main():
+    print(f'{"items":>7} {"build (ms)":>11} {"scan (us)":>10} '
+          f'{"index (us)":>11} {"speedup":>8}')
+    for size in SIZES:
+        menu = build_menu(size)
+        tokenized = [tokenize(item.label) for item in menu.body]
+
+        build = min(timeit.repeat(lambda: SearchIndex(menu),
+                                  number=1, repeat=3))
+        index = SearchIndex(menu)
+
+        for query in QUERIES:
+            assert (index.narrow(query).body ==
+                    linear_scan(menu, tokenized, query).body)
+
+        number = max(1, 10000 // size)
+        scan = min(timeit.repeat(
+            lambda: [linear_scan(menu, tokenized, q) for q in QUERIES],
+            number=number, repeat=3)) / number / len(QUERIES)
+        indexed = min(timeit.repeat(
+            lambda: [index.narrow(q) for q in QUERIES],
+            number=number, repeat=3)) / number / len(QUERIES)
+
+        print(f'{size:>7} {build * 1e3:>11.1f} {scan * 1e6:>10.0f} '
+              f'{indexed * 1e6:>11.0f} {scan / indexed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
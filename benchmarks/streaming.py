@@ -0,0 +1,59 @@
+"""
+Time to first byte and peak memory of ``Response.iter_json()`` against
+``Response.as_json()`` for large menus.
+
+Usage: PYTHONPATH=. python benchmarks/streaming.py
+"""
+import time
+import tracemalloc
+
+from onem import Response
+from onem.menus import Menu, MenuItem
+
+
+SIZES = (1000, 10000, 100000)
+
+
+def build_response(size):
+    body = [MenuItem(f'Directory entry {i}', f'/entries/{i}',
+                     text_search=f'entry {i}') for i in range(size)]
+    return Response(Menu(body, header='Directory', footer='Reply A-Z'))
+
+
+def first_byte(produce):
+    start = time.perf_counter()
+    produce()
+    return time.perf_counter() - start
+
+
+def peak(consume):
+    tracemalloc.start()
+    consume()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def drain(chunks):
+    for _ in chunks:
+        pass
+
+
+def main():
+    print(f'{"items":>7} {"ttfb as_json (ms)":>18} {"ttfb stream (ms)":>17} '
+          f'{"peak as_json (KiB)":>19} {"peak stream (KiB)":>18}')
+    for size in SIZES:
+        response = build_response(size)
+
+        ttfb_full = first_byte(lambda: response.as_json().encode('utf-8'))
+        ttfb_stream = first_byte(lambda: next(response.iter_json()))
+
+        peak_full = peak(lambda: response.as_json().encode('utf-8'))
+        peak_stream = peak(lambda: drain(response.iter_json()))
+
+        print(f'{size:>7} {ttfb_full * 1e3:>18.2f} {ttfb_stream * 1e3:>17.2f} '
+              f'{peak_full / 1024:>19.0f} {peak_stream / 1024:>18.0f}')
+
+
+if __name__ == '__main__':
+    main()
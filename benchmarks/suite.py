@@ -0,0 +1,208 @@
+"""
+Benchmark suite for building and serializing menus, forms and responses.
+
+For every case and size it reports:
+
+- ops/sec of the operation
+- blocks: memory blocks still allocated by the result of one operation
+- peak: peak traced memory (KiB) while running one operation
+- bytes: size of the JSON payload returned (or built) by the operation
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/suite.py --save before.json
+    # ... change things ...
+    PYTHONPATH=. python benchmarks/suite.py --compare before.json
+
+``--compare`` exits with status 1 when a case runs more than ``--threshold``
+(default 10%) slower than in the saved results.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from onem import Response, encoders, forms
+from onem.menus import Menu, MenuItem, MenuMeta
+
+
+SIZES = (1, 10, 100, 1000, 10000)
+
+
+def build_menu(size):
+    body = [MenuItem(f'Item {i}', f'/items/{i}', text_search=f'item {i}')
+            for i in range(size)]
+    return Menu(body, header='header', footer='footer', meta=MenuMeta())
+
+
+def build_form(size):
+    """ Form with ``size`` items cycling through every FormItemType """
+    factories = (
+        lambda i: forms.StringFormItem(f'string{i}', label='Name',
+                                       min_length=2, max_length=20),
+        lambda i: forms.HiddenFormItem(f'hidden{i}', 'value'),
+        lambda i: forms.IntFormItem(f'int{i}', label='Age', min_value=12),
+        lambda i: forms.FloatFormItem(f'float{i}', label='Rank',
+                                      max_value=9.9),
+        lambda i: forms.DateFormItem(f'date{i}', label='Date'),
+        lambda i: forms.DateTimeFormItem(f'datetime{i}', label='Datetime'),
+        lambda i: forms.MenuFormItem(f'menu{i}', [
+            forms.MenuItemFormItem('Yes', 'yes'),
+            forms.MenuItemFormItem('No', 'no'),
+        ], meta=forms.MenuFormItemMeta(multi_select=True)),
+    )
+    items = [factories[i % len(factories)](i) for i in range(size)]
+    return forms.Form(items, '/callback', method='POST',
+                      meta=forms.FormMeta(confirm=False))
+
+
+def build_menu_form_item(size):
+    body = [forms.MenuItemFormItem(f'Option {i}', i) for i in range(size)]
+    return forms.MenuFormItem('choice', body, label='Choose',
+                              meta=forms.MenuFormItemMeta(numbered=True))
+
+
+def cases(size):
+    menu = build_menu(size)
+    form = build_form(size)
+    menu_form_item = build_menu_form_item(size)
+    menu_response = Response(menu)
+    form_response = Response(form)
+
+    return {
+        'menu.build': lambda: build_menu(size),
+        'menu.as_data': menu.as_data,
+        'menu.as_json': menu.as_json,
+        'form.build': lambda: build_form(size),
+        'form.as_json': form.as_json,
+        'form_menu_item.build': lambda: build_menu_form_item(size),
+        'form_menu_item.as_json': menu_form_item.as_json,
+        'response.menu.as_json': menu_response.as_json,
+        'response.menu.encode': lambda: encoders.encode(menu_response),
+        'response.form.as_json': form_response.as_json,
+        'response.form.as_json_bytes': form_response.as_json_bytes,
+    }
+
+
+def payload_bytes(result):
+    """ Size of the JSON payload of the result of a case """
+    if hasattr(result, 'as_data'):
+        result = encoders.encode(result)
+    elif not isinstance(result, (str, bytes)):
+        result = json.dumps(result)
+    if isinstance(result, str):
+        result = result.encode('utf-8')
+    return len(result)
+
+
+def ops_per_sec(func, min_time, repeat=3):
+    """ Best of ``repeat`` runs of at least ``min_time`` seconds each """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed))
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+def memory(func):
+    func()  # warm up caches (compiled encoders, backends)
+    gc.collect()
+    tracemalloc.start()
+    blocks = len(tracemalloc.take_snapshot().traces)
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    blocks = len(tracemalloc.take_snapshot().traces) - blocks
+    tracemalloc.stop()
+    del result
+    return blocks, peak
+
+
+def run(sizes, min_time):
+    results = {}
+    for size in sizes:
+        for name, func in cases(size).items():
+            blocks, peak = memory(func)
+            results[f'{name}[{size}]'] = {
+                'ops_per_sec': ops_per_sec(func, min_time),
+                'blocks': blocks,
+                'peak_bytes': peak,
+                'payload_bytes': payload_bytes(func()),
+            }
+    return results
+
+
+def compare(results, baseline):
+    """
+    Returns the ops/sec change ratio of each case also in ``baseline``
+    """
+    return {name: result['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1
+            for name, result in results.items() if name in baseline}
+
+
+def report(results, changes=None):
+    changes = changes or {}
+    print(f'{"case":<38} {"ops/sec":>12} {"blocks":>8} {"peak KiB":>9} '
+          f'{"bytes":>9} {"change":>8}')
+    for name, r in results.items():
+        change = (f'{changes[name] * 100:+7.1f}%' if name in changes
+                  else '')
+        print(f'{name:<38} {r["ops_per_sec"]:>12.1f} {r["blocks"]:>8} '
+              f'{r["peak_bytes"] / 1024:>9.1f} {r["payload_bytes"]:>9} '
+              f'{change:>8}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds spent timing each case')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='fail when ops/sec drops more than this ratio')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.min_time)
+
+    changes = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        changes = compare(results, baseline)
+    regressions = [name for name, change in changes.items()
+                   if change < -args.threshold]
+
+    report(results, changes)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version,
+                       'platform': platform.platform(),
+                       'results': results}, f, indent=2)
+
+    if regressions:
+        print(f'\n{len(regressions)} case(s) slower than the '
+              f'{args.threshold:.0%} threshold:')
+        for name in regressions:
+            print(f'  {name}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+``Template.render_json()`` against building and encoding the Response on
+every request.
+
+Usage: PYTHONPATH=. python benchmarks/templates.py
+"""
+import timeit
+
+from onem import Response
+from onem.menus import Menu, MenuItem
+from onem.templates import Placeholder, Template
+
+
+SIZES = (10, 100, 1000)
+
+
+def build(size, name, balance):
+    body = [MenuItem(f'Hello {name}', '/profile')]
+    body.extend(MenuItem(f'Item {i}', f'/items/{i}') for i in range(size))
+    return Response(Menu(body, header=f'Balance: {balance}'))
+
+
+def main():
+    print(f'{"items":>6} {"build (us)":>11} {"render (us)":>12} '
+          f'{"speedup":>8}')
+    for size in SIZES:
+        template = Template(build(size, Placeholder('name'),
+                                  Placeholder('balance')))
+        number = max(10, 10000 // size)
+
+        before = min(timeit.repeat(
+            lambda: build(size, 'Jane', '10 USD').as_json(),
+            number=number, repeat=5)) / number
+        after = min(timeit.repeat(
+            lambda: template.render_json(name='Jane', balance='10 USD'),
+            number=number, repeat=5)) / number
+
+        print(f'{size:>6} {before * 1e6:>11.1f} {after * 1e6:>12.2f} '
+              f'{before / after:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,8 @@
-import json
+from . import menus, forms, encoders
+from .common import StreamableMixin
 
-from . import menus, forms
 
-
-class Response(object):
+class Response(StreamableMixin):
     def __init__(self, obj):
         """
         :param obj: a Menu of Form instance
@@ -12,11 +11,32 @@ class Response(object):
 
         self.object = obj
 
+    @property
+    def content_type(self):
+        return self.object.content_type
+
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds the response and its Menu or Form out of its ``as_data()``
+        dict
+
+        :param trusted: skip the validation for data produced by this library
+        """
+        content_type = data['content_type']
+        if content_type == menus.Menu.content_type:
+            obj = menus.Menu.from_data(data['content'], trusted=trusted)
+        elif content_type == forms.Form.content_type:
+            obj = forms.Form.from_data(data['content'], trusted=trusted)
+        else:
+            raise Exception(f'Invalid content type: {content_type}')
+        return cls(obj)
+
     def as_data(self):
         return {
-            'content_type': self.object.as_data()['type'],
+            'content_type': self.object.content_type,
             'content': self.object.as_data()
         }
 
-    def as_json(self):
-        return json.dumps(self.as_data())
+
+encoders.register(Response, encoders.response_layout)
@@ -0,0 +1,145 @@
+"""
+Serialization from asyncio code without blocking the event loop.
+
+Payloads with fewer than ``THRESHOLD`` items are encoded inline, where an
+executor round trip would cost more than the encoding itself. Larger ones are
+encoded in an executor: the loop default (thread) executor unless another one,
+i.e. a ``ProcessPoolExecutor``, is set with ``configure``::
+
+    aio.configure(threshold=2000, executor=ProcessPoolExecutor(4))
+    ...
+    aio.reset()  # back to the default threshold and executor
+
+    payload = await response.as_json_async()
+
+    async for chunk in response.aiter_json():
+        await send({'type': 'http.response.body', 'body': chunk,
+                    'more_body': True})
+
+Objects sent to a process pool are pickled, so they should only hold
+picklable values.
+"""
+import asyncio
+import concurrent.futures
+
+from onem import common, forms
+
+
+DEFAULT_THRESHOLD = 1000
+THRESHOLD = DEFAULT_THRESHOLD
+
+_executor = None
+
+
+def configure(threshold=None, executor=None):
+    """
+    :param threshold: number of items above which encoding is offloaded
+    :param executor: ``concurrent.futures.Executor`` used for the large
+        payloads, None keeps the current one (see ``reset``)
+    """
+    global THRESHOLD, _executor
+    if threshold is not None:
+        THRESHOLD = threshold
+    if executor is not None:
+        _executor = executor
+
+
+def reset():
+    """ Restores ``DEFAULT_THRESHOLD`` and the loop default executor """
+    global THRESHOLD, _executor
+    THRESHOLD = DEFAULT_THRESHOLD
+    _executor = None
+
+
+def size(obj):
+    """ Returns the number of body items of ``obj`` and of its children """
+    obj = getattr(obj, 'object', obj)  # Response
+    items = getattr(obj, 'items', None)
+    if items is None:
+        items = getattr(obj, 'body', None)
+    if items is None:
+        return 0
+
+    count = len(items)
+    if isinstance(items, common.ItemColumns):
+        return count
+    for item in items:
+        if isinstance(item, forms.MenuFormItem):
+            count += len(item.body)
+    return count
+
+
+def is_large(obj):
+    return size(obj) >= THRESHOLD
+
+
+def _encode(obj, backend):
+    return obj.as_json(backend=backend)
+
+
+def _encode_bytes(obj, backend):
+    return obj.as_json_bytes(backend=backend)
+
+
+async def _offload(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, func, *args)
+
+
+async def as_json(obj, backend=None):
+    """ Returns ``obj.as_json(backend)``, offloaded when ``obj`` is large """
+    if not is_large(obj):
+        return obj.as_json(backend=backend)
+    return await _offload(_encode, obj, backend)
+
+
+async def as_json_bytes(obj, backend=None):
+    """ Same as ``as_json`` but returns UTF-8 encoded bytes """
+    if not is_large(obj):
+        return obj.as_json_bytes(backend=backend)
+    return await _offload(_encode_bytes, obj, backend)
+
+
+async def iter_json(obj, chunk_size=8192):
+    """
+    Yields the JSON encoded bytes of ``obj`` in chunks of about
+    ``chunk_size`` bytes. Chunks of large payloads are produced in the
+    executor, or encoded at once and split when it is a process pool.
+    """
+    if not is_large(obj):
+        for chunk in obj.iter_json(chunk_size=chunk_size):
+            yield chunk
+        return
+
+    if isinstance(_executor, concurrent.futures.ProcessPoolExecutor):
+        payload = await _offload(_encode_bytes, obj, 'json')
+        for start in range(0, len(payload), chunk_size):
+            yield payload[start:start + chunk_size]
+        return
+
+    chunks = obj.iter_json(chunk_size=chunk_size)
+    while True:
+        chunk = await _offload(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def send_response(send, obj, status=200, headers=(),
+                        chunk_size=8192):
+    """
+    Sends ``obj`` as the streamed JSON body of an ASGI HTTP response
+
+    :param send: the ASGI ``send`` callable
+    :param headers: extra ``(name, value)`` byte string header pairs
+    """
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + list(headers),
+    })
+    async for chunk in iter_json(obj, chunk_size=chunk_size):
+        await send({'type': 'http.response.body', 'body': chunk,
+                    'more_body': True})
+    await send({'type': 'http.response.body', 'body': b'',
+                'more_body': False})
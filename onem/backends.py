@@ -0,0 +1,192 @@
+"""
+JSON backends used by ``as_json()`` and ``as_json_bytes()``.
+
+The process-wide backend defaults to the stdlib ``json`` module, through the
+compiled ``onem.encoders``; ``'plain'`` is ``json.dumps(obj.as_data())``
+without them, should an encoder ever be suspected. The faster orjson and
+ujson encoders are opt-in, per call or with ``set_backend``, and ``'auto'``
+picks the fastest one installed. All backends produce semantically
+identical payloads, only the whitespace and escaping of non-ASCII
+characters may differ, except that orjson writes NaN and infinite floats as
+``null``. Values a fast encoder rejects (integers beyond 64 bits, ...) are
+encoded with the stdlib instead.
+"""
+import json
+
+
+class JSONBackend(object):
+    """ Base class of the JSON backends """
+    name = None
+
+    def dumps(self, data):
+        """ Returns ``data`` encoded as a JSON ``str`` """
+        raise NotImplementedError
+
+    def dumps_bytes(self, data):
+        """ Returns ``data`` encoded as JSON UTF-8 ``bytes`` """
+        return self.dumps(data).encode('utf-8')
+
+    def encode(self, obj):
+        """ Returns the JSON ``str`` of an object providing ``as_data()`` """
+        return self.dumps(obj.as_data())
+
+    def encode_bytes(self, obj):
+        """ Returns the JSON ``bytes`` of an object providing ``as_data()`` """
+        return self.dumps_bytes(obj.as_data())
+
+
+class FastBackend(JSONBackend):
+    """
+    Base class of the third party encoders, falls back to the stdlib for the
+    values they don't support
+    """
+    def _fast_dumps(self, data):
+        """ Returns ``data`` encoded as JSON ``bytes`` or ``str`` """
+        raise NotImplementedError
+
+    def _dumps(self, data):
+        try:
+            return self._fast_dumps(data)
+        except (TypeError, OverflowError):
+            return json.dumps(data)
+
+    def dumps(self, data):
+        out = self._dumps(data)
+        return out if isinstance(out, str) else out.decode('utf-8')
+
+    def dumps_bytes(self, data):
+        out = self._dumps(data)
+        return out.encode('utf-8') if isinstance(out, str) else out
+
+    def encode(self, obj):
+        # frozen objects are spliced as their cached fragment instead
+        from onem import encoders
+        if encoders.contains_frozen(obj):
+            return encoders.encode(obj)
+        return self.dumps(obj.as_data())
+
+    def encode_bytes(self, obj):
+        from onem import encoders
+        if encoders.contains_frozen(obj):
+            return encoders.encode(obj).encode('utf-8')
+        return self.dumps_bytes(obj.as_data())
+
+
+class StdlibBackend(JSONBackend):
+    name = 'json'
+
+    def dumps(self, data):
+        return json.dumps(data)
+
+    def encode(self, obj):
+        # the compiled encoders output exactly what json.dumps() does and
+        # splice the cached fragments of frozen objects
+        from onem import encoders
+        return encoders.encode(obj)
+
+    def encode_bytes(self, obj):
+        return self.encode(obj).encode('utf-8')
+
+
+class PlainBackend(JSONBackend):
+    """
+    ``json.dumps(obj.as_data())`` as is, neither compiled encoders nor
+    cached fragments of frozen objects are used
+    """
+    name = 'plain'
+
+    def dumps(self, data):
+        return json.dumps(data)
+
+
+class OrjsonBackend(FastBackend):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson_dumps = orjson.dumps
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def _fast_dumps(self, data):
+        return self._orjson_dumps(data, option=self._option)
+
+
+class UjsonBackend(FastBackend):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson_dumps = ujson.dumps
+
+    def _fast_dumps(self, data):
+        return self._ujson_dumps(data, ensure_ascii=False)
+
+
+BACKENDS = {
+    'orjson': OrjsonBackend,
+    'ujson': UjsonBackend,
+    'json': StdlibBackend,
+    'plain': PlainBackend,
+}
+
+# tried in this order when the backend is 'auto'
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+_instances = {}
+_default = 'json'
+
+
+def get_backend(name=None):
+    """
+    Returns the backend instance called ``name``
+
+    :param name: one of ``BACKENDS``, ``'auto'`` or None for the process-wide
+        default set with ``set_backend``
+    """
+    if name is None:
+        name = _default
+
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+
+    if name == 'auto':
+        for candidate in PREFERENCE:
+            try:
+                backend = get_backend(candidate)
+            except ImportError:
+                continue
+            _instances['auto'] = backend
+            return backend
+
+    if name not in BACKENDS:
+        raise Exception(f'Invalid JSON backend. Allowed: '
+                        f'{["auto"] + list(BACKENDS)}')
+
+    backend = _instances[name] = BACKENDS[name]()
+    return backend
+
+
+def set_backend(name):
+    """
+    Sets the process-wide default JSON backend
+
+    :param name: one of ``BACKENDS`` or ``'auto'``
+    """
+    get_backend(name)  # fail early if it's not installed
+
+    global _default
+    _default = name
+
+
+def available_backends():
+    """ Returns the names of the backends installed in this environment """
+    names = []
+    for name in PREFERENCE:
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,123 @@
+"""
+Rendering of one payload per recipient for broadcast campaigns::
+
+    template = Template(Response(Menu(...Placeholder('name')...)))
+
+    with open('campaign.jsonl', 'wb') as f:
+        batch.write_jsonl(f, template, recipients, processes=8)
+
+The source is either a ``Template`` rendered with each params dict or a
+factory function called with each params (``**params`` when it is a dict)
+and returning a Response, Menu, Form, str or bytes.
+
+With ``processes`` the params are split in chunks of ``chunksize`` rendered
+by a process pool. Output keeps the order of the params and at most
+``max_pending`` chunks are in flight, so memory use doesn't depend on the
+number of recipients. The source, params and results are pickled: factories
+must be module level functions.
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from onem.templates import Template
+
+
+_source = None
+
+
+def _render(source, params, backend):
+    if isinstance(source, Template):
+        return source.render_json_bytes(**params)
+
+    obj = source(**params) if isinstance(params, dict) else source(params)
+    if isinstance(obj, bytes):
+        return obj
+    if isinstance(obj, str):
+        return obj.encode('utf-8')
+    return obj.as_json_bytes(backend=backend)
+
+
+def _init_worker(source):
+    global _source
+    _source = source
+
+
+def _render_chunk(source, chunk, backend):
+    if source is None:
+        source = _source
+    return [_render(source, params, backend) for params in chunk]
+
+
+def _chunks(params, chunksize):
+    params = iter(params)
+    while True:
+        chunk = list(itertools.islice(params, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_many(source, params, processes=None, chunksize=256,
+                max_pending=None, executor=None, backend=None):
+    """
+    Yields the serialized bytes of ``source`` rendered with each of
+    ``params``, in order
+
+    :param source: Template or factory function
+    :param params: iterable of per recipient params
+    :param processes: size of the process pool, None to render in the
+        calling process. With ``executor``, its number of workers, which
+        defaults to ``os.cpu_count()`` and sets the default ``max_pending``
+    :param chunksize: number of params sent to a worker at once
+    :param max_pending: chunks in flight, defaults to twice the workers
+    :param executor: ``concurrent.futures.Executor`` to use instead of
+        creating a pool
+    :param backend: JSON backend used for factory results
+    """
+    assert chunksize > 0, 'chunksize must be positive'
+
+    if executor is None and not processes:
+        for p in params:
+            yield _render(source, p, backend)
+        return
+
+    workers = processes or os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    own_executor = executor is None
+    if own_executor:
+        # the source is sent once per worker instead of once per chunk
+        executor = concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=_init_worker, initargs=(source,))
+    sent = None if own_executor else source
+
+    pending = collections.deque()
+    try:
+        for chunk in _chunks(params, chunksize):
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_render_chunk, sent, chunk,
+                                           backend))
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+
+def write_jsonl(fp, source, params, **kws):
+    """
+    Writes one payload per line into ``fp`` (a binary file) and returns the
+    number of payloads written. Accepts the ``render_many`` arguments.
+    """
+    count = 0
+    for payload in render_many(source, params, **kws):
+        fp.write(payload)
+        fp.write(b'\n')
+        count += 1
+    return count
@@ -0,0 +1,279 @@
+"""
+Cache of the serialized bytes of responses keyed on the arguments of the
+handlers building them::
+
+    cache = ResponseCache(max_size=10000, ttl=60)
+
+    @cache.cached(tags=lambda user_id: [f'user:{user_id}'])
+    def profile_menu(user_id):
+        return Response(Menu(...))
+
+    profile_menu(42)  # bytes, built once per minute at most
+    cache.invalidate_tag('user:42')
+
+Entries are evicted least recently used first once ``max_size`` entries are
+stored and expire ``ttl`` seconds after being set. The cache is thread-safe
+and the decorator works with ``async def`` handlers as well.
+
+There is no single-flight: concurrent misses of the same key all call the
+handler and the last one stored wins. Handlers are expected to be cheap
+enough, or idempotent, for the rare duplicate build to be acceptable.
+
+The entries are held by a backend: ``LocalBackend`` (the default) keeps them
+in process, a shared store can be plugged in by implementing the
+``CacheBackend`` methods.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+
+class Entry(object):
+    __slots__ = ('value', 'expires', 'tags')
+
+    def __init__(self, value, expires=None, tags=()):
+        """
+        :param value: the cached bytes
+        :param expires: ``time.time()`` after which the entry is stale, None
+            to never expire
+        :param tags: tags the entry can be invalidated with
+        """
+        self.value = value
+        self.expires = expires
+        self.tags = frozenset(tags)
+
+
+class CacheBackend(object):
+    """ Storage of the cache entries, keys are hashable """
+
+    def get(self, key):
+        """ Returns the Entry stored for ``key`` or None """
+        raise NotImplementedError
+
+    def set(self, key, entry):
+        """ Stores ``entry``, returns the number of entries evicted """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """ Removes ``key``, returns True if it was stored """
+        raise NotImplementedError
+
+    def delete_tag(self, tag):
+        """ Removes the entries tagged ``tag``, returns how many """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class LocalBackend(CacheBackend):
+    """ In process LRU store holding at most ``max_size`` entries """
+
+    def __init__(self, max_size=1024):
+        assert max_size is None or max_size > 0, 'max_size must be positive'
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._tags = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        if key in self._entries:
+            self.delete(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        evicted = 0
+        while self.max_size is not None and len(self._entries) > self.max_size:
+            self.delete(next(iter(self._entries)))
+            evicted += 1
+        return evicted
+
+    def delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+        return True
+
+    def delete_tag(self, tag):
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheStats(object):
+    __slots__ = ('hits', 'misses', 'sets', 'evictions', 'expirations',
+                 'invalidations')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def make_key(func, args, kws):
+    """ Default key of a ``cached`` handler call """
+    return (func.__module__, func.__qualname__, args,
+            tuple(sorted(kws.items())))
+
+
+def _serialize(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return value.as_json_bytes()
+
+
+class ResponseCache(object):
+    def __init__(self, max_size=1024, ttl=None, backend=None,
+                 clock=time.time):
+        """
+        :param max_size: number of entries of the default LocalBackend
+        :param ttl: seconds an entry stays valid, None to never expire
+        :param backend: CacheBackend instance, defaults to a LocalBackend
+        :param clock: function returning the current time in seconds
+        """
+        self.ttl = ttl
+        self.backend = backend if backend is not None else LocalBackend(
+            max_size)
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Returns the cached bytes of ``key`` or None """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is not None and entry.expires is not None \
+                    and entry.expires <= self.clock():
+                self.backend.delete(key)
+                self.stats.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return entry.value
+
+    def set(self, key, value, ttl=None, tags=()):
+        """
+        Stores ``value`` (a Response, Menu, Form or already serialized bytes)
+        and returns its bytes
+
+        :param ttl: overrides the cache ``ttl`` for this entry
+        :param tags: tags ``invalidate_tag`` can remove the entry with
+        """
+        value = _serialize(value)
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            expires = None if ttl is None else self.clock() + ttl
+            evicted = self.backend.set(key, Entry(value, expires, tags))
+            self.stats.sets += 1
+            self.stats.evictions += evicted
+        return value
+
+    def invalidate(self, key):
+        """ Removes ``key``, returns True if it was cached """
+        with self._lock:
+            deleted = self.backend.delete(key)
+            self.stats.invalidations += deleted
+            return deleted
+
+    def invalidate_tag(self, tag):
+        """ Removes every entry tagged ``tag``, returns how many """
+        with self._lock:
+            deleted = self.backend.delete_tag(tag)
+            self.stats.invalidations += deleted
+            return deleted
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self.backend)
+
+    def cached(self, ttl=None, tags=(), key=None):
+        """
+        Decorator caching the serialized result of a handler (plain or
+        ``async def``), the decorated handler returns bytes
+
+        :param ttl: overrides the cache ``ttl`` for this handler
+        :param tags: sequence of tags or function called with the handler
+            arguments returning them
+        :param key: function called with the handler arguments returning the
+            cache key, defaults to the handler name and arguments
+        """
+        def decorator(func):
+            def cache_key(args, kws):
+                if key is not None:
+                    return key(*args, **kws)
+                return make_key(func, args, kws)
+
+            def store(cache_key, args, kws, value):
+                entry_tags = tags(*args, **kws) if callable(tags) else tags
+                return self.set(cache_key, value, ttl=ttl, tags=entry_tags)
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kws):
+                    # get() and set() hold the threading.Lock for one
+                    # backend call and never across an await: with the
+                    # LocalBackend dict operations, that doesn't block the
+                    # event loop and the cache can be shared with threads
+                    k = cache_key(args, kws)
+                    value = self.get(k)
+                    if value is None:
+                        value = store(k, args, kws, await func(*args, **kws))
+                    return value
+                wrapper = async_wrapper
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kws):
+                    k = cache_key(args, kws)
+                    value = self.get(k)
+                    if value is None:
+                        value = store(k, args, kws, func(*args, **kws))
+                    return value
+
+            def invalidate(*args, **kws):
+                return self.invalidate(cache_key(args, kws))
+
+            wrapper.invalidate = invalidate
+            wrapper.cache = self
+            return wrapper
+        return decorator
@@ -0,0 +1,221 @@
+"""
+CBOR (RFC 8949) encoding of the ``as_data()`` payloads, a binary alternative
+to JSON for the hops between internal services::
+
+    payload = response.as_cbor()
+    response = Response.from_cbor(payload, trusted=True)
+
+The encoder and decoder are implemented here and cover the JSON data model
+(null, booleans, integers, floats, strings, arrays and maps) plus byte
+strings. The ``cbor2`` package, when installed, is used instead for speed.
+Both produce and accept the same encoding: definite lengths and 64 bit
+floats.
+"""
+import struct
+
+
+class CBORError(Exception):
+    pass
+
+
+def _head(major, n):
+    """ Returns the initial bytes of an item of ``major`` type """
+    major <<= 5
+    if n < 24:
+        return bytes((major | n,))
+    if n < 0x100:
+        return bytes((major | 24, n))
+    if n < 0x10000:
+        return struct.pack('>BH', major | 25, n)
+    if n < 0x100000000:
+        return struct.pack('>BI', major | 26, n)
+    return struct.pack('>BQ', major | 27, n)
+
+
+# initial bytes of the short strings, arrays and maps
+_TEXT = [_head(3, n) for n in range(24)]
+_ARRAY = [_head(4, n) for n in range(24)]
+_MAP = [_head(5, n) for n in range(24)]
+
+_pack_float = struct.Struct('>Bd').pack
+
+
+def _encode_int(value, out):
+    if value >= 0:
+        major = 0
+    else:
+        major = 1
+        value = -1 - value
+    if value < 0x10000000000000000:
+        out.append(_head(major, value))
+        return
+    # bignum, tag 2 or 3
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    out.append(_head(6, 2 + major))
+    out.append(_head(2, len(data)))
+    out.append(data)
+
+
+def _encode(value, out):
+    cls = value.__class__
+    if cls is str:
+        if value.isascii():
+            data = value.encode('ascii')
+        else:
+            data = value.encode('utf-8')
+        n = len(data)
+        out.append(_TEXT[n] if n < 24 else _head(3, n))
+        out.append(data)
+    elif value is None:
+        out.append(b'\xf6')
+    elif value is True:
+        out.append(b'\xf5')
+    elif value is False:
+        out.append(b'\xf4')
+    elif cls is dict:
+        n = len(value)
+        out.append(_MAP[n] if n < 24 else _head(5, n))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif cls is list or cls is tuple:
+        n = len(value)
+        out.append(_ARRAY[n] if n < 24 else _head(4, n))
+        for item in value:
+            _encode(item, out)
+    elif cls is int:
+        _encode_int(value, out)
+    elif cls is float:
+        out.append(_pack_float(0xfb, value))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value)
+        out.append(_head(2, len(value)))
+        out.append(value)
+    elif isinstance(value, str):
+        _encode(str(value), out)
+    elif isinstance(value, int):
+        _encode_int(int(value), out)
+    elif isinstance(value, float):
+        _encode(float(value), out)
+    elif isinstance(value, dict):
+        _encode(dict(value), out)
+    elif isinstance(value, (list, tuple)):
+        _encode(list(value), out)
+    else:
+        raise CBORError(f'Unsupported type: {cls.__name__}')
+
+
+def _argument(data, info, pos):
+    if info < 24:
+        return info, pos
+    if info == 24:
+        return data[pos], pos + 1
+    if info == 25:
+        return int.from_bytes(data[pos:pos + 2], 'big'), pos + 2
+    if info == 26:
+        return int.from_bytes(data[pos:pos + 4], 'big'), pos + 4
+    if info == 27:
+        return int.from_bytes(data[pos:pos + 8], 'big'), pos + 8
+    raise CBORError(f'Unsupported additional information: {info}')
+
+
+_SIMPLE = {20: False, 21: True, 22: None, 23: None}
+_FLOATS = {25: (struct.Struct('>e'), 2), 26: (struct.Struct('>f'), 4),
+           27: (struct.Struct('>d'), 8)}
+
+
+def _decode(data, pos):
+    ib = data[pos]
+    pos += 1
+    major = ib >> 5
+    info = ib & 0x1f
+
+    if major == 7:
+        if info in _SIMPLE:
+            return _SIMPLE[info], pos
+        if info in _FLOATS:
+            unpack, size = _FLOATS[info]
+            return unpack.unpack_from(data, pos)[0], pos + size
+        raise CBORError(f'Unsupported simple value: {info}')
+
+    n, pos = _argument(data, info, pos)
+    if major == 3:
+        end = pos + n
+        if end > len(data):
+            raise CBORError('Truncated string')
+        return data[pos:end].decode('utf-8'), end
+    if major == 0:
+        return n, pos
+    if major == 5:
+        value = {}
+        for _ in range(n):
+            key, pos = _decode(data, pos)
+            value[key], pos = _decode(data, pos)
+        return value, pos
+    if major == 4:
+        value = []
+        for _ in range(n):
+            item, pos = _decode(data, pos)
+            value.append(item)
+        return value, pos
+    if major == 1:
+        return -1 - n, pos
+    if major == 2:
+        end = pos + n
+        if end > len(data):
+            raise CBORError('Truncated byte string')
+        return bytes(data[pos:end]), end
+    # major 6, tags
+    value, pos = _decode(data, pos)
+    if n in (2, 3) and isinstance(value, bytes):
+        value = int.from_bytes(value, 'big')
+        return (value if n == 2 else -1 - value), pos
+    raise CBORError(f'Unsupported tag: {n}')
+
+
+def py_dumps(data):
+    """ Returns the CBOR bytes of ``data`` (pure Python encoder) """
+    out = []
+    _encode(data, out)
+    return b''.join(out)
+
+
+def py_loads(data):
+    """ Returns the value of the CBOR bytes ``data`` (pure Python decoder) """
+    try:
+        value, pos = _decode(data, 0)
+    except (IndexError, struct.error):
+        raise CBORError('Truncated data')
+    except UnicodeDecodeError as e:
+        raise CBORError(f'Invalid UTF-8 string: {e}')
+    if pos != len(data):
+        raise CBORError('Extra data after the first item')
+    return value
+
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def dumps(data, accelerated=True):
+    """
+    Returns the CBOR bytes of ``data``
+
+    :param accelerated: use ``cbor2`` when installed
+    """
+    if accelerated and cbor2 is not None:
+        return cbor2.dumps(data)
+    return py_dumps(data)
+
+
+def loads(data, accelerated=True):
+    """
+    Returns the value of the CBOR bytes ``data``
+
+    :param accelerated: use ``cbor2`` when installed
+    """
+    if accelerated and cbor2 is not None:
+        return cbor2.loads(data)
+    return py_loads(data)
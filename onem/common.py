@@ -1,3 +1,9 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+from onem import backends, frozen
+
+
 ALLOWED_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS',
                    'TRACE']
 
@@ -19,3 +25,250 @@ def sanitize_url(url):
     if not url.startswith('/'):
         raise Exception('Invalid url path.')
     return url
+
+
+def sanitize_methods(methods, default='GET'):
+    """
+    ``sanitize_method`` applied to a whole column, validating each distinct
+    value only once
+    """
+    sanitized = {method: sanitize_method(method, default=default)
+                 for method in set(methods)}
+    return tuple([sanitized[method] for method in methods])
+
+
+def sanitize_urls(urls):
+    """ ``sanitize_url`` applied to a whole column """
+    urls = tuple([url if isinstance(url, str) else None for url in urls])
+    if not all([url.startswith('/') for url in urls if url is not None]):
+        raise Exception('Invalid url path.')
+    return urls
+
+
+def json_value(v):
+    """ Returns the JSON text of a scalar as ``json.dumps`` does """
+    cls = v.__class__
+    if cls is str:
+        return encode_basestring_ascii(v)
+    if v is None:
+        return 'null'
+    if v is True:
+        return 'true'
+    if v is False:
+        return 'false'
+    if cls is int:
+        return int.__repr__(v)
+    return json.dumps(v)
+
+
+def column(values, size=None):
+    """
+    Returns ``values`` (any sequence or a NumPy array) as a tuple of ``size``
+    python values
+    """
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    values = tuple(values)
+    if size is not None and len(values) != size:
+        raise Exception(f'Invalid column length {len(values)}, '
+                        f'expected {size}')
+    return values
+
+
+def from_attrs(cls, attrs):
+    """
+    Returns a ``cls`` instance with the ``attrs`` attributes set without
+    calling its constructor, i.e. without any validation
+    """
+    obj = cls.__new__(cls)
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    return obj
+
+
+def _restore_columns(cls, columns):
+    obj = cls.__new__(cls)
+    obj._set_columns(**columns)
+    return obj
+
+
+class ItemColumns(object):
+    """
+    Read-only sequence of body items stored as columns. Items are only built
+    when accessed by index or iteration, serialization reads the columns
+    directly. Columns are tuples set once by the constructor, so frozen
+    menus and forms can share them.
+    """
+    __slots__ = ()
+    item_class = None
+
+    def _set_columns(self, **columns):
+        for name, value in columns.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise frozen.FrozenError(f'{self.__class__.__name__} is read-only, '
+                                 f'can not set {name!r}')
+
+    def __delattr__(self, name):
+        raise frozen.FrozenError(f'{self.__class__.__name__} is read-only, '
+                                 f'can not delete {name!r}')
+
+    def __reduce__(self):
+        return _restore_columns, (self.__class__, {
+            name: getattr(self, name) for name in self.__slots__})
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('item index out of range')
+        return self.item(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.item(i)
+
+    def item(self, index):
+        """ Returns the item instance of row ``index`` """
+        raise NotImplementedError
+
+    def as_data(self):
+        """ Returns the list of item dicts as the items' ``as_data()`` """
+        raise NotImplementedError
+
+    def iter_json_items(self):
+        """ Yields the JSON string of each item """
+        raise NotImplementedError
+
+
+class FreezableMixin(object):
+    __slots__ = ()
+
+    def freeze(self):
+        """
+        Returns an immutable copy of this object (see ``onem.frozen``) which
+        caches its JSON fragment and can be shared between threads and
+        requests
+        """
+        return frozen.freeze(self)
+
+    def digest(self):
+        """
+        Returns the digest (bytes) of the JSON payload, see ``onem.digests``
+        """
+        from onem import digests
+
+        return digests.digest(self)
+
+
+class JSONMixin(FreezableMixin):
+    """ JSON output built from ``as_data()`` """
+    __slots__ = ()
+
+    def as_json(self, backend=None, compact=False):
+        """
+        :param backend: name of the JSON backend, defaults to the one set with
+            ``onem.backends.set_backend``
+        :param compact: omit the fields left to their default value (see
+            ``onem.compact``)
+        """
+        if compact:
+            from onem import compact as compact_mode
+            return compact_mode.as_json(self, backend=backend)
+        return backends.get_backend(backend).encode(self)
+
+    def as_json_bytes(self, backend=None, compact=False):
+        """
+        Same as ``as_json`` but returns ready to send UTF-8 encoded bytes
+        """
+        if compact:
+            from onem import compact as compact_mode
+            return compact_mode.as_json_bytes(self, backend=backend)
+        return backends.get_backend(backend).encode_bytes(self)
+
+    @classmethod
+    def from_json(cls, s, trusted=False):
+        """
+        Rebuilds the object out of its JSON ``str`` or ``bytes``, see
+        ``from_data``
+        """
+        return cls.from_data(json.loads(s), trusted=trusted)
+
+    def as_cbor(self):
+        """ Returns the CBOR encoded ``as_data()``, see ``onem.cbor`` """
+        from onem import cbor
+
+        return cbor.dumps(self.as_data())
+
+    @classmethod
+    def from_cbor(cls, data, trusted=False):
+        """ Rebuilds the object out of its CBOR bytes, see ``from_data`` """
+        from onem import cbor
+
+        return cls.from_data(cbor.loads(data), trusted=trusted)
+
+
+class StreamableMixin(JSONMixin):
+    """ Streaming JSON output for Response, Menu and Form objects """
+    __slots__ = ()
+
+    def etag(self, weak=False):
+        """ Returns the quoted ``ETag`` header value of the JSON payload """
+        from onem import digests
+
+        return digests.etag(self, weak=weak)
+
+    def as_json_compressed(self, encoding='gzip'):
+        """
+        Returns the JSON payload compressed with ``encoding`` (``'gzip'`` or
+        ``'deflate'``), computed once for frozen objects
+        """
+        from onem import compression
+
+        return compression.compress(self, encoding)
+
+    def iter_json(self, chunk_size=8192):
+        """
+        Yields the JSON encoded bytes in chunks of about ``chunk_size`` bytes
+        emitting header and meta first and then the body items one by one
+
+        :param chunk_size: minimum size of each chunk except the last one
+        """
+        from onem import encoders
+
+        for chunk in encoders.iterencode(self, chunk_size=chunk_size):
+            yield chunk.encode('utf-8')
+
+    async def as_json_async(self, backend=None):
+        """
+        ``as_json`` for asyncio code, large payloads are encoded in an
+        executor (see ``onem.aio``)
+        """
+        from onem import aio
+
+        return await aio.as_json(self, backend=backend)
+
+    async def as_json_bytes_async(self, backend=None):
+        from onem import aio
+
+        return await aio.as_json_bytes(self, backend=backend)
+
+    def aiter_json(self, chunk_size=8192):
+        """ Async iterator over the chunks of ``iter_json`` """
+        from onem import aio
+
+        return aio.iter_json(self, chunk_size=chunk_size)
+
+    def write_json(self, fp, chunk_size=8192):
+        """
+        Writes the JSON encoded bytes into ``fp`` (any object with a ``write``
+        method accepting bytes, i.e. a binary file, buffer or socket file)
+        """
+        for chunk in self.iter_json(chunk_size=chunk_size):
+            fp.write(chunk)
@@ -0,0 +1,183 @@
+"""
+Compact payloads omitting the fields left to their default value.
+
+Most form item fields are None or a default (``editable``, ``required``,
+...) and content menu items have no method, path nor search text. The
+compact payload drops them, along with empty ``validation`` blocks, which
+makes it several times smaller::
+
+    payload = response.as_json(compact=True)
+
+    full = compact.expand(json.loads(payload))  # == response.as_data()
+
+Only the fields listed in ``DEFAULTS`` can be dropped, the ``type`` and
+``name`` of form items, the ``hidden`` flag and the form ``path``/``method``
+are always kept. ``expand()`` puts the dropped fields back, in the order of
+the full payload.
+"""
+from onem import backends, forms, menus, schema
+
+
+_FORM_ITEM = {
+    'chunking_footer': None,
+    'confirmation_label': None,
+    'editable': True,
+    'footer': None,
+    'header': None,
+    'description': None,
+    'method': None,
+    'required': True,
+    'status_exclude': False,
+    'status_prepend': False,
+    'url': None,
+    'value': None,
+    'meta': None,
+}
+
+# default value of each optional field per schema shape, fields of the
+# ``validation`` blocks all default to None
+DEFAULTS = {
+    'menu_item': {'description': None, 'method': None, 'path': None,
+                  'type': 'option', 'text_search': None},
+    'menu_meta': {'auto_select': True},
+    'menu': {'header': None, 'footer': None, 'meta': None},
+    'string_item': _FORM_ITEM,
+    'hidden_item': _FORM_ITEM,
+    'int_item': _FORM_ITEM,
+    'float_item': _FORM_ITEM,
+    'date_item': _FORM_ITEM,
+    'datetime_item': _FORM_ITEM,
+    'menu_form_item': _FORM_ITEM,
+    'form_menu_option': {'description': None, 'type': 'option',
+                         'text_search': None, 'value': None},
+    'form_menu_meta': {'auto_select': False, 'multi_select': False,
+                       'numbered': False},
+    'form_meta': {'completion_status_show': True,
+                  'completion_status_in_header': True,
+                  'confirmation_needed': True},
+    'form': {'header': None, 'footer': None, 'meta': None},
+}
+
+_MISSING = object()
+
+
+def _shape(name, d):
+    if name == 'form_item':
+        shape = schema.form_item_shape(d)
+        if shape is None:
+            raise Exception(f'Invalid form item type: {d.get("type")}')
+        return shape
+    return name
+
+
+def _is_default(value, default):
+    return value == default and value.__class__ is default.__class__
+
+
+def _compact(d, name):
+    name = _shape(name, d)
+    defaults = DEFAULTS[name]
+    nested = schema.NESTED[name]
+
+    out = {}
+    for key, value in d.items():
+        default = defaults.get(key, _MISSING)
+        if default is not _MISSING and _is_default(value, default):
+            continue
+        check = nested.get(key)
+        if check is not None and value is not None:
+            kind, arg = check
+            if kind == 'dict':
+                value = {k: v for k, v in value.items() if v is not None}
+                if not value:
+                    continue
+            elif kind == 'list':
+                value = [_compact(item, arg) for item in value]
+            else:
+                value = _compact(value, arg)
+        out[key] = value
+    return out
+
+
+def _expand(d, name):
+    name = _shape(name, d)
+    defaults = DEFAULTS[name]
+
+    out = {}
+    for key, check in schema.SHAPES[name]:
+        value = d.get(key, _MISSING)
+        if isinstance(check, tuple) and check[0] == 'dict':
+            value = {} if value is _MISSING else value
+            value = {k: value.get(k) for k, _ in check[1]}
+        elif value is _MISSING:
+            value = defaults.get(key, _MISSING)
+            if value is _MISSING:
+                raise Exception(f'Missing field: {key}')
+        elif value is not None and isinstance(check, tuple):
+            kind, arg = check
+            if kind == 'list':
+                value = [_expand(item, arg) for item in value]
+            elif kind == 'object?':
+                value = _expand(value, arg)
+        out[key] = value
+
+    for key, value in d.items():
+        if key not in out:
+            out[key] = value
+    return out
+
+
+def _response(d, convert):
+    content_type = d['content_type']
+    return {'content_type': content_type,
+            'content': convert(d['content'], content_type)}
+
+
+def compact(data, shape=None):
+    """
+    Returns the compact copy of the ``as_data()`` dict of a Response, Menu,
+    Form or item
+
+    :param shape: schema shape name of ``data``, defaults to a Response,
+        Menu or Form based on its keys
+    """
+    if shape is None:
+        if 'content_type' in data:
+            return _response(data, _compact)
+        shape = data['type']
+    return _compact(data, shape)
+
+
+def expand(data, shape=None):
+    """ Returns the full payload of the ``compact`` one, see ``compact`` """
+    if shape is None:
+        if 'content_type' in data:
+            return _response(data, _expand)
+        shape = data['type']
+    return _expand(data, shape)
+
+
+def shape_of(obj):
+    """ Returns the schema shape name of a Menu, Form or item """
+    if isinstance(obj, forms.MenuItemFormItem):
+        return 'form_menu_option'
+    if isinstance(obj, menus.MenuItem):
+        return 'menu_item'
+    if isinstance(obj, forms.BaseFormItem):
+        return 'form_item'
+    if isinstance(obj, (menus.Menu, forms.Form)):
+        return obj.content_type
+    return None
+
+
+def as_data(obj):
+    """ Returns the compact ``as_data()`` of ``obj`` """
+    return compact(obj.as_data(), shape_of(obj))
+
+
+def as_json(obj, backend=None):
+    return backends.get_backend(backend).dumps(as_data(obj))
+
+
+def as_json_bytes(obj, backend=None):
+    return backends.get_backend(backend).dumps_bytes(as_data(obj))
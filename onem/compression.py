@@ -0,0 +1,125 @@
+"""
+Compressed encodings of the JSON payload of Response, Menu and Form objects.
+
+Frozen objects compress their payload once per encoding and level and keep
+the result, so serving a static menu to every user costs no compression::
+
+    encoding, body = compression.negotiate_payload(
+        menu_response, request.headers.get('Accept-Encoding'))
+    headers = {'Content-Length': str(len(body))}
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+
+Supported encodings are ``gzip`` (with a zero timestamp so equal payloads
+give equal bytes) and ``deflate``, which is zlib wrapped deflate as defined
+for HTTP.
+"""
+import gzip
+import zlib
+
+from onem import frozen
+
+
+LEVEL = 6
+
+
+def _gzip(data, level):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _deflate(data, level):
+    return zlib.compress(data, level)
+
+
+COMPRESSORS = {
+    'gzip': _gzip,
+    'deflate': _deflate,
+}
+
+# preferred first when the client accepts several with the same weight
+PREFERENCE = ('gzip', 'deflate')
+
+
+def compress(obj, encoding='gzip', level=LEVEL):
+    """
+    Returns the JSON payload of ``obj`` compressed with ``encoding``,
+    cached for frozen objects
+    """
+    try:
+        compressor = COMPRESSORS[encoding]
+    except KeyError:
+        raise Exception(f'Invalid encoding: {encoding}. '
+                        f'Allowed: {list(COMPRESSORS)}')
+
+    if not frozen.is_frozen(obj):
+        return compressor(obj.as_json_bytes(), level)
+
+    try:
+        cache = obj._compressed
+    except AttributeError:
+        cache = {}
+        object.__setattr__(obj, '_compressed', cache)
+
+    key = (encoding, level)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    body = cache[key] = compressor(obj.as_json_bytes(), level)
+    return body
+
+
+def content_length(obj, encoding='identity', level=LEVEL):
+    """ Returns the size in bytes of the payload sent with ``encoding`` """
+    if encoding == 'identity':
+        return len(obj.as_json_bytes())
+    return len(compress(obj, encoding, level))
+
+
+def _parse_accept_encoding(header):
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def negotiate(accept_encoding, available=PREFERENCE):
+    """
+    Returns the encoding of ``available`` preferred by the
+    ``Accept-Encoding`` header or ``'identity'``
+    """
+    if not accept_encoding:
+        return 'identity'
+
+    weights = _parse_accept_encoding(accept_encoding)
+    default = weights.get('*', 0.0)
+
+    best = 'identity'
+    best_weight = 0.0
+    for encoding in available:
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def negotiate_payload(obj, accept_encoding, level=LEVEL):
+    """
+    Returns the ``(encoding, body)`` tuple of ``obj`` to send for the
+    ``Accept-Encoding`` header
+    """
+    encoding = negotiate(accept_encoding)
+    if encoding == 'identity':
+        return encoding, obj.as_json_bytes()
+    return encoding, compress(obj, encoding, level)
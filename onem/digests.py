@@ -0,0 +1,143 @@
+"""
+Stable digests of the JSON payload of Response, Menu and Form objects and of
+their items, for ``ETag``/``If-None-Match`` handling and for deduplicating
+identical responses::
+
+    etag = response.etag()
+    if digests.if_none_match(request.headers.get('If-None-Match'), etag):
+        return 304
+
+Objects without nested objects (items, metas) are hashed out of their JSON
+fragment. Menus, forms, menu form items and responses combine their own
+fields with the digests of their meta and body items, so equal payloads have
+equal digests whether they are frozen, built out of columns or not.
+
+Frozen objects cache their digest: hashing a new Menu whose body is mostly
+made of frozen items only encodes the items that changed.
+"""
+import hashlib
+import json
+
+from onem import common, encoders, frozen
+
+
+DIGEST_SIZE = 16
+
+_NULL = b'\x00null'
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def _has_children(layout):
+    for key, kind, source in layout:
+        if kind in ('object', 'sequence'):
+            return True
+        if kind == 'dict' and _has_children(source):
+            return True
+    return False
+
+
+def _update(h, obj, layout):
+    for key, kind, source in layout:
+        h.update(key.encode('utf-8') + b'\x00')
+        if kind == 'attr':
+            h.update(encoders._value(getattr(obj, source)).encode('utf-8'))
+        elif kind == 'const':
+            h.update(json.dumps(source).encode('utf-8'))
+        elif kind == 'expr':
+            h.update(encoders._value(encoders._evaluate(source, obj))
+                     .encode('utf-8'))
+        elif kind == 'object':
+            value = getattr(obj, source)
+            h.update(_NULL if value is None else digest(value))
+        elif kind == 'sequence':
+            items = getattr(obj, source)
+            h.update(f'[{len(items)}'.encode('utf-8'))
+            if isinstance(items, common.ItemColumns):
+                for fragment in items.iter_json_items():
+                    h.update(_hash(fragment.encode('utf-8')))
+            else:
+                for item in items:
+                    h.update(digest(item))
+        elif kind == 'dict':
+            _update(h, obj, source)
+        else:
+            raise Exception(f'Invalid layout kind: {kind}')
+        h.update(b'\x01')
+
+
+_LAYOUTS = {}
+
+
+def _layout(cls):
+    """ Returns the layout of ``cls`` if it has nested objects, else None """
+    try:
+        return _LAYOUTS[cls]
+    except KeyError:
+        pass
+    layout = encoders._find_layout(cls)
+    if layout is not None:
+        layout = layout(cls)
+        if not _has_children(layout):
+            layout = None
+    _LAYOUTS[cls] = layout
+    return layout
+
+
+def _compute(obj):
+    layout = _layout(obj.__class__)
+    if layout is None:
+        return _hash(encoders.encode(obj).encode('utf-8'))
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    _update(h, obj, layout)
+    return h.digest()
+
+
+def digest(obj):
+    """
+    Returns the ``DIGEST_SIZE`` bytes digest of the JSON payload of ``obj``
+    (a Response, Menu, Form or any of their items)
+    """
+    if frozen.is_frozen(obj):
+        try:
+            return obj._digest
+        except AttributeError:
+            pass
+        value = _compute(obj)
+        object.__setattr__(obj, '_digest', value)
+        return value
+    return _compute(obj)
+
+
+def hexdigest(obj):
+    return digest(obj).hex()
+
+
+def etag(obj, weak=False):
+    """ Returns the quoted ``ETag`` header value of ``obj`` """
+    tag = f'"{hexdigest(obj)}"'
+    return f'W/{tag}' if weak else tag
+
+
+def if_none_match(header, tag):
+    """
+    Returns True when the ``If-None-Match`` request ``header`` matches the
+    ``tag`` ETag, that is when a 304 Not Modified can be sent. Weak and
+    strong tags are compared the same way, as required for this header.
+    """
+    if not header:
+        return False
+    header = header.strip()
+    if header == '*':
+        return True
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
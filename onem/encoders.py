@@ -0,0 +1,426 @@
+"""
+Compiled JSON encoders.
+
+``encode(obj)`` returns exactly ``json.dumps(obj.as_data())`` but builds the
+string straight from the instance attributes. The first time a class is
+encoded, its field layout is turned into one specialized function which is
+cached and reused for every following instance of that class.
+
+It is what ``as_json()`` uses with the default stdlib backend;
+``as_json(backend='plain')`` calls ``json.dumps(obj.as_data())`` instead.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+
+from onem import common, forms, frozen, menus
+from onem.common import json_value as _value
+
+
+def _optional(obj):
+    if obj is None:
+        return 'null'
+    return encoder_for(obj.__class__)(obj)
+
+
+def _sequence(items):
+    if isinstance(items, common.ItemColumns):
+        return '[' + ', '.join(items.iter_json_items()) + ']'
+    return '[' + ', '.join([encoder_for(item.__class__)(item)
+                            for item in items]) + ']'
+
+
+# Field layouts. Each entry is a ``(key, kind, source)`` tuple where kind is
+# one of:
+#   'attr'     - scalar attribute value
+#   'const'    - value known when the class is compiled
+#   'expr'     - python expression evaluated against ``obj``
+#   'object'   - optional nested object (meta)
+#   'sequence' - list of nested objects (body)
+#   'dict'     - nested dict whose source is a layout itself
+
+def _menu_item_layout(cls):
+    return [
+        ('description', 'attr', 'label'),
+        ('method', 'attr', 'method'),
+        ('path', 'attr', 'url'),
+        ('type', 'expr', "'option' if obj.is_option else 'content'"),
+        ('text_search', 'attr', 'text_search'),
+    ]
+
+
+def _menu_meta_layout(cls):
+    return [
+        ('auto_select', 'attr', 'auto_select'),
+    ]
+
+
+def _menu_layout(cls):
+    return [
+        ('type', 'const', cls.content_type),
+        ('header', 'attr', 'header'),
+        ('footer', 'attr', 'footer'),
+        ('body', 'sequence', 'body'),
+        ('meta', 'object', 'meta'),
+    ]
+
+
+def _form_item_layout(cls, validation=()):
+    return [
+        ('name', 'attr', 'name'),
+        ('type', 'const', cls.item_type),
+        ('chunking_footer', 'attr', 'chunking_footer'),
+        ('confirmation_label', 'attr', 'confirmation_label'),
+        ('editable', 'attr', 'editable'),
+        ('footer', 'attr', 'footer'),
+        ('header', 'attr', 'header'),
+        ('description', 'attr', 'label'),
+        ('method', 'attr', 'method'),
+        ('required', 'attr', 'required'),
+        ('status_exclude', 'attr', 'status_exclude'),
+        ('status_prepend', 'attr', 'status_prepend'),
+        ('url', 'attr', 'url'),
+        ('validation', 'dict', [
+            ('url', 'attr', 'validate_url'),
+            ('type_error', 'attr', 'validate_type_error'),
+            ('type_error_footer', 'attr', 'validate_type_error_footer'),
+        ] + list(validation)),
+    ]
+
+
+def _string_form_item_layout(cls):
+    return _form_item_layout(cls, validation=[
+        ('min_length', 'attr', 'min_length'),
+        ('min_length_error', 'attr', 'min_length_error'),
+        ('max_length', 'attr', 'max_length'),
+        ('max_length_error', 'attr', 'max_length_error'),
+    ])
+
+
+def _hidden_form_item_layout(cls):
+    return _form_item_layout(cls) + [
+        ('hidden', 'const', True),
+        ('value', 'attr', 'value'),
+    ]
+
+
+def _int_form_item_layout(cls):
+    return _form_item_layout(cls, validation=[
+        ('min_value', 'attr', 'min_value'),
+        ('min_value_error', 'attr', 'min_value_error'),
+        ('max_value', 'attr', 'max_value'),
+        ('max_value_error', 'attr', 'max_value_error'),
+    ])
+
+
+def _menu_form_item_layout(cls):
+    return _form_item_layout(cls) + [
+        ('meta', 'object', 'meta'),
+        ('body', 'sequence', 'body'),
+    ]
+
+
+def _menu_item_form_item_layout(cls):
+    return [
+        ('description', 'attr', 'label'),
+        ('type', 'expr', "'option' if obj.is_option else 'content'"),
+        ('text_search', 'attr', 'text_search'),
+        ('value', 'attr', 'value'),
+    ]
+
+
+def _menu_form_item_meta_layout(cls):
+    return [
+        ('auto_select', 'attr', 'auto_select'),
+        ('multi_select', 'attr', 'multi_select'),
+        ('numbered', 'attr', 'numbered'),
+    ]
+
+
+def _form_meta_layout(cls):
+    return [
+        ('completion_status_show', 'attr', 'status'),
+        ('completion_status_in_header', 'attr', 'status_in_header'),
+        ('confirmation_needed', 'attr', 'confirm'),
+    ]
+
+
+def _form_layout(cls):
+    return [
+        ('type', 'const', cls.content_type),
+        ('header', 'attr', 'header'),
+        ('footer', 'attr', 'footer'),
+        ('body', 'sequence', 'items'),
+        ('meta', 'object', 'meta'),
+        ('path', 'attr', 'url'),
+        ('method', 'attr', 'method'),
+    ]
+
+
+def response_layout(cls):
+    return [
+        ('content_type', 'expr', 'obj.object.content_type'),
+        ('content', 'object', 'object'),
+    ]
+
+
+LAYOUTS = {
+    menus.MenuItem: _menu_item_layout,
+    menus.MenuMeta: _menu_meta_layout,
+    menus.Menu: _menu_layout,
+    forms.BaseFormItem: _form_item_layout,
+    forms.StringFormItem: _string_form_item_layout,
+    forms.HiddenFormItem: _hidden_form_item_layout,
+    forms.IntFormItem: _int_form_item_layout,
+    forms.MenuFormItem: _menu_form_item_layout,
+    forms.MenuItemFormItem: _menu_item_form_item_layout,
+    forms.MenuFormItemMeta: _menu_form_item_meta_layout,
+    forms.FormMeta: _form_meta_layout,
+    forms.Form: _form_layout,
+}
+
+_ENCODERS = {}
+
+
+def _layout_parts(layout):
+    """
+    Flattens a layout into a list of ``(is_const, source)`` tuples where
+    constants are JSON text and the rest are python expressions.
+    """
+    parts = [(True, '{')]
+    for i, (key, kind, source) in enumerate(layout):
+        parts.append((True, ('' if i == 0 else ', ') +
+                      encode_basestring_ascii(key) + ': '))
+        if kind == 'attr':
+            parts.append((False, f'_value(obj.{source})'))
+        elif kind == 'const':
+            parts.append((True, json.dumps(source)))
+        elif kind == 'expr':
+            parts.append((False, f'_value({source})'))
+        elif kind == 'object':
+            parts.append((False, f'_optional(obj.{source})'))
+        elif kind == 'sequence':
+            parts.append((False, f'_sequence(obj.{source})'))
+        elif kind == 'dict':
+            parts.extend(_layout_parts(source))
+        else:
+            raise Exception(f'Invalid layout kind: {kind}')
+    parts.append((True, '}'))
+    return parts
+
+
+def compile_layout(cls, layout):
+    """
+    Generates the source of the encoder function for ``layout`` and returns
+    the compiled function.
+    """
+    args = []
+    const = ''
+    for is_const, source in _layout_parts(layout):
+        if is_const:
+            const += source
+            continue
+        if const:
+            args.append(repr(const))
+            const = ''
+        args.append(source)
+    if const:
+        args.append(repr(const))
+
+    name = f'encode_{cls.__name__}'
+    source = (f'def {name}(obj):\n'
+              f'    return "".join(({", ".join(args)},))\n')
+
+    namespace = {'_value': _value, '_optional': _optional,
+                 '_sequence': _sequence}
+    exec(compile(source, f'<onem encoder {cls.__qualname__}>', 'exec'),
+         namespace)
+    return namespace[name]
+
+
+def register(cls, layout):
+    """
+    Registers the ``layout`` function used to compile the encoder of ``cls``
+    and its subclasses
+    """
+    LAYOUTS[cls] = layout
+    _ENCODERS.clear()
+    _CHILDREN.clear()
+
+
+def _as_data_encoder(obj):
+    return json.dumps(obj.as_data())
+
+
+def _find_layout(cls):
+    """
+    Returns the layout function registered for ``cls`` or for the closest
+    base class as long as ``as_data`` was not overridden in between.
+    """
+    for base in cls.__mro__:
+        if base in LAYOUTS:
+            if cls.as_data is base.as_data:
+                return LAYOUTS[base]
+            return None
+    return None
+
+
+def _cached_encoder(encoder):
+    """ Caches the JSON fragment of frozen objects """
+    def encode_frozen(obj):
+        try:
+            return obj._json
+        except AttributeError:
+            pass
+        fragment = encoder(obj)
+        object.__setattr__(obj, '_json', fragment)
+        return fragment
+    return encode_frozen
+
+
+def encoder_for(cls):
+    """ Returns the (cached) compiled encoder function for ``cls`` """
+    try:
+        return _ENCODERS[cls]
+    except KeyError:
+        pass
+
+    layout = _find_layout(cls)
+    if layout is None:
+        encoder = _as_data_encoder
+    else:
+        encoder = compile_layout(cls, layout(cls))
+
+    if frozen.is_frozen(cls):
+        encoder = _cached_encoder(encoder)
+
+    _ENCODERS[cls] = encoder
+    return encoder
+
+
+_CHILDREN = {}
+
+
+def _child_fields(layout):
+    for key, kind, source in layout:
+        if kind in ('object', 'sequence'):
+            yield kind, source
+        elif kind == 'dict':
+            yield from _child_fields(source)
+
+
+def _children(cls):
+    """ Returns the ``(kind, attribute)`` nested object fields of ``cls`` """
+    try:
+        return _CHILDREN[cls]
+    except KeyError:
+        pass
+    layout = _find_layout(cls)
+    fields = () if layout is None else tuple(_child_fields(layout(cls)))
+    _CHILDREN[cls] = fields
+    return fields
+
+
+def contains_frozen(obj):
+    """ Returns True if ``obj`` or any of its nested objects is frozen """
+    cls = obj.__class__
+    if '_frozen_base' in cls.__dict__:
+        return True
+    for kind, name in _children(cls):
+        value = getattr(obj, name)
+        if value is None:
+            continue
+        if kind == 'object':
+            if contains_frozen(value):
+                return True
+        elif not isinstance(value, common.ItemColumns):
+            for item in value:
+                item_cls = item.__class__
+                if '_frozen_base' in item_cls.__dict__:
+                    return True
+                if _children(item_cls) and contains_frozen(item):
+                    return True
+    return False
+
+
+def encode(obj):
+    """
+    Returns the JSON string of ``obj`` (a Response, Menu, Form or any of their
+    items) which is identical to ``json.dumps(obj.as_data())``
+    """
+    return encoder_for(obj.__class__)(obj)
+
+
+_EXPRESSIONS = {}
+
+
+def _evaluate(source, obj):
+    try:
+        code = _EXPRESSIONS[source]
+    except KeyError:
+        code = _EXPRESSIONS[source] = compile(source, '<onem expr>', 'eval')
+    return eval(code, {}, {'obj': obj})
+
+
+def _iter_layout(obj, layout):
+    yield '{'
+    for i, (key, kind, source) in enumerate(layout):
+        yield ('' if i == 0 else ', ') + encode_basestring_ascii(key) + ': '
+        if kind == 'attr':
+            yield _value(getattr(obj, source))
+        elif kind == 'const':
+            yield json.dumps(source)
+        elif kind == 'expr':
+            yield _value(_evaluate(source, obj))
+        elif kind == 'object':
+            value = getattr(obj, source)
+            if value is None:
+                yield 'null'
+            else:
+                yield from _iter_parts(value)
+        elif kind == 'sequence':
+            items = getattr(obj, source)
+            if isinstance(items, common.ItemColumns):
+                encoded = items.iter_json_items()
+            else:
+                encoded = (encoder_for(item.__class__)(item)
+                           for item in items)
+            yield '['
+            for j, item in enumerate(encoded):
+                if j:
+                    yield ', '
+                yield item
+            yield ']'
+        elif kind == 'dict':
+            yield from _iter_layout(obj, source)
+        else:
+            raise Exception(f'Invalid layout kind: {kind}')
+    yield '}'
+
+
+def _iter_parts(obj):
+    cls = obj.__class__
+    layout = _find_layout(cls)
+    if layout is None or frozen.is_frozen(cls):
+        yield encoder_for(cls)(obj)
+    else:
+        yield from _iter_layout(obj, layout(cls))
+
+
+def iterencode(obj, chunk_size=8192):
+    """
+    Yields the JSON string of ``obj`` in chunks of about ``chunk_size``
+    characters. Body items are encoded one at a time so only the current
+    chunk is held in memory. The joined chunks are identical to
+    ``encode(obj)``.
+    """
+    buf = []
+    size = 0
+    for part in _iter_parts(obj):
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield ''.join(buf)
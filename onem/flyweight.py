@@ -0,0 +1,153 @@
+"""
+Shared instances of the items and strings repeated across menus and forms.
+
+``item()`` returns one frozen, validated and already serialized instance per
+distinct item definition, so building ``Back`` or ``Yes``/``No`` items for
+every request costs a dict lookup::
+
+    from onem import flyweight
+
+    body = [MenuItem(...), flyweight.item(MenuItem, 'Back', '/back')]
+    menu = Menu(body, footer=flyweight.intern('Reply with a number'))
+
+    flyweight.stats()  # objects and bytes deduplicated so far
+
+Definitions are keyed on the class and the arguments, with their types at
+any depth, so ``True`` and ``1`` or ``(True,)`` and ``(1,)`` differ.
+Arguments must be hashable; definitions with unhashable ones are built
+every time.
+"""
+import sys
+import threading
+
+from onem import encoders, frozen
+
+
+class FlyweightStats(object):
+    __slots__ = ('objects', 'objects_deduplicated', 'bytes_deduplicated',
+                 'strings', 'strings_deduplicated',
+                 'string_bytes_deduplicated')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _typed(values):
+    return tuple([_typed_value(v) for v in values])
+
+
+def _typed_value(v):
+    """
+    Key of ``v`` telling apart the values that compare equal but serialize
+    differently: ``1``/``True``/``1.0``, ``0.0``/``-0.0`` and tuples of them
+    """
+    cls = v.__class__
+    if isinstance(v, tuple):
+        return cls, _typed(v)
+    if isinstance(v, float):
+        return cls, repr(v)
+    return cls, v
+
+
+def _footprint(obj):
+    """ Approximate memory used by ``obj``, its strings and JSON fragment """
+    size = sys.getsizeof(obj)
+    for name in frozen._slot_names(obj.__class__):
+        value = getattr(obj, name, None)
+        if isinstance(value, str):
+            size += sys.getsizeof(value)
+    return size + sys.getsizeof(getattr(obj, '_json', ''))
+
+
+class Registry(object):
+    def __init__(self, max_size=10000):
+        """
+        :param max_size: number of distinct items and of distinct strings
+            kept, definitions beyond are built but not shared
+        """
+        self.max_size = max_size
+        self.stats = FlyweightStats()
+        self._items = {}
+        self._strings = {}
+        self._lock = threading.Lock()
+
+    def intern(self, s):
+        """ Returns the shared copy of the string ``s`` """
+        if s is None:
+            return None
+        key = (s.__class__, s)
+        with self._lock:
+            shared = self._strings.get(key)
+            if shared is None:
+                if len(self._strings) < self.max_size:
+                    self._strings[key] = s
+                    self.stats.strings += 1
+                return s
+            if shared is not s:
+                self.stats.strings_deduplicated += 1
+                self.stats.string_bytes_deduplicated += sys.getsizeof(s)
+            return shared
+
+    def item(self, cls, *args, **kws):
+        """
+        Returns the shared frozen ``cls(*args, **kws)`` instance, its string
+        arguments are interned
+        """
+        try:
+            key = (cls, _typed(args), _typed(sorted(kws.items())))
+            hash(key)
+        except TypeError:
+            return cls(*args, **kws).freeze()
+
+        with self._lock:
+            shared = self._items.get(key)
+            if shared is not None:
+                self.stats.objects_deduplicated += 1
+                self.stats.bytes_deduplicated += shared[1]
+                return shared[0]
+
+        args = [self.intern(a) if isinstance(a, str) else a for a in args]
+        kws = {k: self.intern(v) if isinstance(v, str) else v
+               for k, v in kws.items()}
+        obj = cls(*args, **kws).freeze()
+        encoders.encode(obj)  # caches the JSON fragment
+
+        with self._lock:
+            shared = self._items.get(key)
+            if shared is not None:
+                return shared[0]
+            if len(self._items) < self.max_size:
+                self._items[key] = (obj, _footprint(obj))
+                self.stats.objects += 1
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._strings.clear()
+            self.stats = FlyweightStats()
+
+    def __len__(self):
+        return len(self._items)
+
+
+REGISTRY = Registry()
+
+
+def item(cls, *args, **kws):
+    """ ``Registry.item`` of the process-wide registry """
+    return REGISTRY.item(cls, *args, **kws)
+
+
+def intern(s):
+    """ ``Registry.intern`` of the process-wide registry """
+    return REGISTRY.intern(s)
+
+
+def stats():
+    """ Returns the deduplication counters of the process-wide registry """
+    return REGISTRY.stats.as_dict()
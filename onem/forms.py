@@ -1,7 +1,7 @@
-import json
-
 from onem import menus
-from onem.common import sanitize_method, sanitize_url
+from onem.common import (FreezableMixin, ItemColumns, JSONMixin,
+                         StreamableMixin, column, from_attrs, json_value,
+                         sanitize_method, sanitize_url)
 
 
 class FormItemType(object):
@@ -13,7 +13,12 @@ class FormItemType(object):
     MENU = 'form-menu'
 
 
-class BaseFormItem(object):
+class BaseFormItem(JSONMixin):
+    __slots__ = ('name', 'chunking_footer', 'confirmation_label', 'editable',
+                 'footer', 'header', 'label', 'method', 'required',
+                 'status_exclude', 'status_prepend', 'url', 'validate_url',
+                 'validate_type_error', 'validate_type_error_footer')
+
     item_type = None
 
     def __init__(self, name,
@@ -79,6 +84,43 @@ class BaseFormItem(object):
 
         self.validate_url = sanitize_url(validate_url)
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds the form item out of its ``as_data()`` dict. Called on
+        BaseFormItem the class is picked out of the item ``type``.
+
+        :param trusted: skip the validation for data produced by this library
+        """
+        if cls is BaseFormItem:
+            return form_item_class(data).from_data(data, trusted=trusted)
+
+        kwargs = cls._kwargs_from_data(data, trusted)
+        if trusted:
+            return from_attrs(cls, kwargs)
+        return cls(**kwargs)
+
+    @classmethod
+    def _kwargs_from_data(cls, data, trusted):
+        validation = data.get('validation') or {}
+        return {
+            'name': data['name'],
+            'chunking_footer': data.get('chunking_footer'),
+            'confirmation_label': data.get('confirmation_label'),
+            'editable': data.get('editable', True),
+            'footer': data.get('footer'),
+            'header': data.get('header'),
+            'label': data.get('description'),
+            'method': data.get('method'),
+            'required': data.get('required', True),
+            'status_exclude': data.get('status_exclude', False),
+            'status_prepend': data.get('status_prepend', False),
+            'url': data.get('url'),
+            'validate_url': validation.get('url'),
+            'validate_type_error': validation.get('type_error'),
+            'validate_type_error_footer': validation.get('type_error_footer'),
+        }
+
     def as_data(self):
         return {
             'name': self.name,
@@ -101,11 +143,11 @@ class BaseFormItem(object):
             },
         }
 
-    def as_json(self):
-        return json.dumps(self.as_data())
-
 
 class StringFormItem(BaseFormItem):
+    __slots__ = ('min_length', 'min_length_error',
+                 'max_length', 'max_length_error')
+
     item_type = FormItemType.STRING
 
     def __init__(self, name,
@@ -120,6 +162,18 @@ class StringFormItem(BaseFormItem):
         self.max_length = max_length
         self.max_length_error = max_length_error
 
+    @classmethod
+    def _kwargs_from_data(cls, data, trusted):
+        kwargs = super(StringFormItem, cls)._kwargs_from_data(data, trusted)
+        validation = data.get('validation') or {}
+        kwargs.update({
+            'min_length': validation.get('min_length'),
+            'min_length_error': validation.get('min_length_error'),
+            'max_length': validation.get('max_length'),
+            'max_length_error': validation.get('max_length_error'),
+        })
+        return kwargs
+
     def as_data(self):
         data = super(StringFormItem, self).as_data()
 
@@ -134,6 +188,8 @@ class StringFormItem(BaseFormItem):
 
 
 class HiddenFormItem(BaseFormItem):
+    __slots__ = ('value',)
+
     item_type = FormItemType.STRING
 
     def __init__(self, name, value):
@@ -142,6 +198,18 @@ class HiddenFormItem(BaseFormItem):
 
         self.value = value
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        if not trusted:
+            return cls(data['name'], data.get('value'))
+        return super(HiddenFormItem, cls).from_data(data, trusted=trusted)
+
+    @classmethod
+    def _kwargs_from_data(cls, data, trusted):
+        kwargs = super(HiddenFormItem, cls)._kwargs_from_data(data, trusted)
+        kwargs['value'] = data.get('value')
+        return kwargs
+
     def as_data(self):
         data = super(HiddenFormItem, self).as_data()
         data.update({
@@ -152,6 +220,9 @@ class HiddenFormItem(BaseFormItem):
 
 
 class IntFormItem(BaseFormItem):
+    __slots__ = ('min_value', 'min_value_error',
+                 'max_value', 'max_value_error')
+
     item_type = FormItemType.INT
 
     def __init__(self, name,
@@ -166,6 +237,18 @@ class IntFormItem(BaseFormItem):
         self.max_value = max_value
         self.max_value_error = max_value_error
 
+    @classmethod
+    def _kwargs_from_data(cls, data, trusted):
+        kwargs = super(IntFormItem, cls)._kwargs_from_data(data, trusted)
+        validation = data.get('validation') or {}
+        kwargs.update({
+            'min_value': validation.get('min_value'),
+            'min_value_error': validation.get('min_value_error'),
+            'max_value': validation.get('max_value'),
+            'max_value_error': validation.get('max_value_error'),
+        })
+        return kwargs
+
     def as_data(self):
         data = super(IntFormItem, self).as_data()
 
@@ -180,18 +263,26 @@ class IntFormItem(BaseFormItem):
 
 
 class FloatFormItem(IntFormItem):
+    __slots__ = ()
+
     item_type = FormItemType.FLOAT
 
 
 class DateFormItem(BaseFormItem):
+    __slots__ = ()
+
     item_type = FormItemType.DATE
 
 
 class DateTimeFormItem(BaseFormItem):
+    __slots__ = ()
+
     item_type = FormItemType.DATETIME
 
 
 class MenuItemFormItem(menus.MenuItem):
+    __slots__ = ('value',)
+
     def __init__(self, label, value=None, text_search=None, is_option=True):
         super(MenuItemFormItem, self).__init__(label, text_search=text_search,
                                                is_option=is_option)
@@ -200,6 +291,21 @@ class MenuItemFormItem(menus.MenuItem):
 
         self.value = value
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        is_option = data['type'] == 'option'
+        if trusted:
+            return from_attrs(cls, {
+                'is_option': is_option,
+                'label': data['description'],
+                'url': None,
+                'method': 'GET' if is_option else None,
+                'text_search': data.get('text_search'),
+                'value': data.get('value'),
+            })
+        return cls(data['description'], value=data.get('value'),
+                   text_search=data.get('text_search'), is_option=is_option)
+
     def as_data(self):
         data = super(MenuItemFormItem, self).as_data()
 
@@ -211,8 +317,76 @@ class MenuItemFormItem(menus.MenuItem):
         return data
 
 
+class MenuItemFormItemColumns(ItemColumns):
+    __slots__ = ('labels', 'values', 'is_option', 'text_search')
+    item_class = MenuItemFormItem
+
+    def __init__(self, labels, values=None, is_option=None, text_search=None):
+        """
+        Column based sequence of MenuItemFormItem, see MenuItemFormItem for
+        the meaning of each column. Content rows (``is_option`` False) get no
+        text_search.
+
+        :param labels: sequence (or NumPy array) of labels
+        :param values: sequence of values, required for option rows
+        :param is_option: sequence of bools, None for options only
+        :param text_search: sequence of search strings, None for no search
+        """
+        labels = column(labels)
+        size = len(labels)
+
+        if is_option is None:
+            is_option = (True,) * size
+        else:
+            is_option = tuple([bool(v) for v in column(is_option, size)])
+
+        values = (None,) * size if values is None else column(values, size)
+        assert all([value is not None for value, option
+                    in zip(values, is_option) if option])
+
+        text_search = ((None,) * size if text_search is None
+                       else column(text_search, size))
+        if not all(is_option):
+            text_search = tuple([
+                v if option else None
+                for v, option in zip(text_search, is_option)])
+
+        self._set_columns(labels=labels, values=values, is_option=is_option,
+                          text_search=text_search)
+
+    def item(self, index):
+        item = MenuItemFormItem.__new__(MenuItemFormItem)
+        item.label = self.labels[index]
+        item.url = None
+        item.is_option = self.is_option[index]
+        item.method = 'GET' if item.is_option else None
+        item.text_search = self.text_search[index]
+        item.value = self.values[index]
+        return item
+
+    def as_data(self):
+        return [{
+            'description': label,
+            'type': 'option' if option else 'content',
+            'text_search': text_search,
+            'value': value,
+        } for label, value, option, text_search in zip(
+            self.labels, self.values, self.is_option, self.text_search)]
+
+    def iter_json_items(self):
+        for label, value, option, text_search in zip(
+                self.labels, self.values, self.is_option, self.text_search):
+            yield ''.join((
+                '{"description": ', json_value(label),
+                ', "type": ', '"option"' if option else '"content"',
+                ', "text_search": ', json_value(text_search),
+                ', "value": ', json_value(value), '}'))
+
+
 class MenuFormItemMeta(menus.MenuMeta):
     """ Meta information for a MenuFormItem object """
+    __slots__ = ('multi_select', 'numbered')
+
     def __init__(self, auto_select=False, multi_select=False, numbered=False):
         """
         :param auto_select: if true auto selects the option if the menu
@@ -228,6 +402,12 @@ class MenuFormItemMeta(menus.MenuMeta):
         self.multi_select = multi_select
         self.numbered = numbered
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        return cls(auto_select=data['auto_select'],
+                   multi_select=data['multi_select'],
+                   numbered=data['numbered'])
+
     def as_data(self):
         data = super(MenuFormItemMeta, self).as_data()
         data.update({
@@ -238,14 +418,17 @@ class MenuFormItemMeta(menus.MenuMeta):
 
 
 class MenuFormItem(BaseFormItem):
+    __slots__ = ('body', 'meta')
+
     item_type = FormItemType.MENU
 
     def __init__(self, name, body, meta=None, **kws):
         super(MenuFormItem, self).__init__(name, **kws)
 
         self.body = body
-        for item in body:
-            assert isinstance(item, MenuItemFormItem)
+        if not isinstance(body, MenuItemFormItemColumns):
+            for item in body:
+                assert isinstance(item, MenuItemFormItem)
 
         self.meta = meta
         if self.meta is None:
@@ -253,15 +436,45 @@ class MenuFormItem(BaseFormItem):
 
         assert isinstance(self.meta, MenuFormItemMeta)
 
+    @classmethod
+    def from_columns(cls, name, labels, values, is_option=None,
+                     text_search=None, **kws):
+        """
+        Builds a MenuFormItem out of columns without creating one
+        MenuItemFormItem per row, see MenuItemFormItemColumns for the columns
+        and MenuFormItem for ``kws``
+        """
+        return cls(name, MenuItemFormItemColumns(labels, values=values,
+                                                 is_option=is_option,
+                                                 text_search=text_search),
+                   **kws)
+
+    @classmethod
+    def _kwargs_from_data(cls, data, trusted):
+        kwargs = super(MenuFormItem, cls)._kwargs_from_data(data, trusted)
+        meta = data.get('meta')
+        kwargs.update({
+            'body': [MenuItemFormItem.from_data(item, trusted=trusted)
+                     for item in data['body']],
+            'meta': (MenuFormItemMeta.from_data(meta, trusted=trusted)
+                     if meta is not None else None),
+        })
+        return kwargs
+
     def as_data(self):
         data = super(MenuFormItem, self).as_data()
         data['meta'] = self.meta.as_data() if self.meta else None
-        data['body'] = [item.as_data() for item in self.body]
+        if isinstance(self.body, ItemColumns):
+            data['body'] = self.body.as_data()
+        else:
+            data['body'] = [item.as_data() for item in self.body]
         return data
 
 
-class FormMeta(object):
+class FormMeta(FreezableMixin):
     """ Meta information for a Form object """
+    __slots__ = ('status', 'status_in_header', 'confirm')
+
     def __init__(self, status=True, status_in_header=True, confirm=True):
         """
         :param status: boolean whether to show the completion status
@@ -273,6 +486,12 @@ class FormMeta(object):
         self.status_in_header = status_in_header
         self.confirm = confirm
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        return cls(status=data['completion_status_show'],
+                   status_in_header=data['completion_status_in_header'],
+                   confirm=data['confirmation_needed'])
+
     def as_data(self):
         return {
             'completion_status_show': self.status,
@@ -281,7 +500,9 @@ class FormMeta(object):
         }
 
 
-class Form(object):
+class Form(StreamableMixin):
+    content_type = 'form'
+
     def __init__(self, items, url, header=None, footer=None, method=None,
                  meta=None):
         """
@@ -312,9 +533,33 @@ class Form(object):
 
         assert isinstance(self.meta, FormMeta)
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds the form out of its ``as_data()`` dict
+
+        :param trusted: skip the validation for data produced by this library
+        """
+        items = [BaseFormItem.from_data(item, trusted=trusted)
+                 for item in data['body']]
+        meta = data.get('meta')
+        if meta is not None:
+            meta = FormMeta.from_data(meta, trusted=trusted)
+
+        if trusted:
+            return from_attrs(cls, {'header': data.get('header'),
+                                    'footer': data.get('footer'),
+                                    'items': items,
+                                    'url': data.get('path'),
+                                    'method': data.get('method'),
+                                    'meta': meta})
+        return cls(items, data.get('path'), header=data.get('header'),
+                   footer=data.get('footer'), method=data.get('method'),
+                   meta=meta)
+
     def as_data(self):
         return {
-            'type': 'form',
+            'type': self.content_type,
             'header': self.header,
             'footer': self.footer,
             'body': [item.as_data() for item in self.items],
@@ -323,5 +568,20 @@ class Form(object):
             'method': self.method
         }
 
-    def as_json(self):
-        return json.dumps(self.as_data())
+
+FORM_ITEM_CLASSES = {
+    cls.item_type: cls for cls in (StringFormItem, IntFormItem, FloatFormItem,
+                                   DateFormItem, DateTimeFormItem,
+                                   MenuFormItem)
+}
+
+
+def form_item_class(data):
+    """ Returns the form item class of an ``as_data()`` dict """
+    if data.get('hidden'):
+        return HiddenFormItem
+
+    try:
+        return FORM_ITEM_CLASSES[data['type']]
+    except KeyError:
+        raise Exception(f'Invalid type. Allowed: {list(FORM_ITEM_CLASSES)}')
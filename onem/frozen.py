@@ -0,0 +1,186 @@
+"""
+Immutable, shareable copies of menus, forms and their items.
+
+``obj.freeze()`` returns a frozen copy of ``obj``: its nested metas and body
+items are frozen as well, lists (bodies included) become tuples and dicts
+read-only ``FrozenDict``s. Frozen objects cache their (stdlib) JSON fragment
+the first time they are encoded and any parent encoded with ``as_json()``,
+``iter_json()`` or ``onem.encoders``, with any backend, splices the cached
+fragment instead of encoding the object again. Only a frozen object encoded
+on its own with another backend explicitly, i.e.
+``obj.as_json(backend='orjson')``, is encoded by that backend without the
+cache. Since frozen objects can't be mutated, the cache never goes stale and
+they are safe to share between threads. The digest used for ETags
+(``onem.digests``) and the compressed payloads (``onem.compression``) are
+cached the same way.
+"""
+CACHE_SLOTS = ('_json', '_digest', '_compressed')
+
+
+class FrozenError(AttributeError):
+    pass
+
+
+def _frozen_setattr(self, name, value):
+    raise FrozenError(f'{self.__class__.__name__} is frozen, '
+                      f'can not set {name!r}')
+
+
+def _frozen_delattr(self, name):
+    raise FrozenError(f'{self.__class__.__name__} is frozen, '
+                      f'can not delete {name!r}')
+
+
+def _uncached_backend(backend):
+    """
+    Returns the backend instance explicitly asked for when it is not the
+    stdlib one the cached fragment is encoded with, else None
+    """
+    if backend is None:
+        return None
+    from onem import backends
+    instance = backends.get_backend(backend)
+    return None if instance.name == 'json' else instance
+
+
+def _frozen_as_json(self, backend=None, compact=False):
+    if compact:
+        from onem import compact as compact_mode
+        return compact_mode.as_json(self, backend=backend)
+    uncached = _uncached_backend(backend)
+    if uncached is not None:
+        return uncached.dumps(self.as_data())
+    from onem import encoders
+    return encoders.encode(self)
+
+
+def _frozen_as_json_bytes(self, backend=None, compact=False):
+    if not compact:
+        uncached = _uncached_backend(backend)
+        if uncached is not None:
+            return uncached.dumps_bytes(self.as_data())
+    return self.as_json(compact=compact, backend=backend).encode('utf-8')
+
+
+def _frozen_reduce(self):
+    return _restore, (self._frozen_base, _state(self))
+
+
+def _slot_names(cls):
+    for klass in reversed(cls.__mro__):
+        for name in klass.__dict__.get('__slots__', ()):
+            if name not in CACHE_SLOTS:
+                yield name
+
+
+def _state(obj):
+    state = {}
+    for name in _slot_names(obj.__class__):
+        try:
+            state[name] = getattr(obj, name)
+        except AttributeError:
+            pass
+    state.update(getattr(obj, '__dict__', {}))
+    return state
+
+
+def _restore(base, state):
+    cls = frozen_class(base)
+    obj = cls.__new__(cls)
+    for name, value in state.items():
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+_CLASSES = {}
+# callables taking every frozen subclass created (see onem.instrumentation)
+_class_hooks = []
+
+
+def frozen_class(cls):
+    """ Returns the (cached) frozen subclass of ``cls`` """
+    if is_frozen(cls):
+        return cls
+
+    try:
+        return _CLASSES[cls]
+    except KeyError:
+        pass
+
+    frozen_cls = type(f'Frozen{cls.__name__}', (cls,), {
+        '__slots__': CACHE_SLOTS,
+        '__module__': cls.__module__,
+        '__setattr__': _frozen_setattr,
+        '__delattr__': _frozen_delattr,
+        '__reduce__': _frozen_reduce,
+        '_frozen_base': cls,
+        'as_json': _frozen_as_json,
+        'as_json_bytes': _frozen_as_json_bytes,
+    })
+    _CLASSES[cls] = frozen_cls
+    for hook in list(_class_hooks):
+        hook(frozen_cls)
+    return frozen_cls
+
+
+def is_frozen(obj_or_cls):
+    cls = obj_or_cls if isinstance(obj_or_cls, type) else obj_or_cls.__class__
+    return '_frozen_base' in cls.__dict__
+
+
+class FrozenDict(dict):
+    """ Read-only dict holding the dict values of frozen objects """
+
+    def _readonly(self, *args, **kws):
+        raise FrozenError('FrozenDict is frozen, can not be modified')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def _freeze_value(value):
+    """
+    Returns the frozen copy of ``value``: lists and tuples become tuples and
+    dicts FrozenDicts, recursively, so the cached fragment can't go stale
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple([_freeze_value(v) for v in value])
+    if isinstance(value, dict):
+        if isinstance(value, FrozenDict):
+            return value
+        return FrozenDict([(k, _freeze_value(v)) for k, v in value.items()])
+    if hasattr(value, 'freeze'):
+        return value.freeze()
+    return value
+
+
+def freeze(obj):
+    """ Returns a frozen copy of ``obj``, or ``obj`` if already frozen """
+    if is_frozen(obj):
+        return obj
+
+    return _restore(obj.__class__, {name: _freeze_value(value)
+                                    for name, value in _state(obj).items()})
+
+
+def replace(obj, **changes):
+    """
+    Returns a shallow copy of ``obj`` with the ``changes`` attributes set.
+    The copy of a frozen object is frozen as well.
+    """
+    state = _state(obj)
+    state.update(changes)
+
+    if is_frozen(obj):
+        return _restore(obj._frozen_base, {name: _freeze_value(value)
+                                           for name, value in state.items()})
+
+    cls = obj.__class__
+    new = cls.__new__(cls)
+    for name, value in state.items():
+        setattr(new, name, value)
+    return new
@@ -0,0 +1,284 @@
+"""
+Opt-in instrumentation of the time and bytes spent building and encoding
+responses.
+
+Nothing is recorded until ``enable()`` is called: it wraps ``__init__``,
+``as_data``, ``as_json`` and ``as_json_bytes`` of the library classes (and
+``as_json``/``as_json_bytes`` of their frozen subclasses, recorded as
+``Frozen<Class>``) and ``disable()`` puts the original methods back, so there
+is no overhead at all while disabled.
+
+Recorded events, per class name:
+
+- ``construct``: one per object built (value 1)
+- ``items``: number of body items of a Menu, Form or MenuFormItem when built
+- ``as_data``: seconds spent in ``as_data()``
+- ``as_json``: seconds spent in ``as_json()``/``as_json_bytes()``
+- ``bytes``: size of the ``as_json()``/``as_json_bytes()`` output
+
+Times are inclusive: a Menu's ``as_data`` time contains its items' time.
+Events are added to the process-wide ``STATS`` and passed to the hooks
+registered with ``add_hook``, i.e. to feed a metrics system::
+
+    instrumentation.add_hook(lambda event, name, value: statsd.incr(...))
+    instrumentation.enable()
+
+``profile()`` collects the events of the current context (thread or
+asyncio task) for a block, without recording anything in ``STATS`` nor
+passing it to the hooks unless ``enable()`` was called. Other contexts only
+pay a context variable lookup per wrapped call while a profile is open::
+
+    with instrumentation.profile() as stats:
+        response.as_json()
+    stats.as_dict()
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+from onem import Response, common, forms, frozen, menus
+
+
+CLASSES = (
+    common.JSONMixin,
+    menus.MenuItem, menus.MenuMeta, menus.Menu, menus.PaginatedMenu,
+    forms.BaseFormItem, forms.StringFormItem, forms.HiddenFormItem,
+    forms.IntFormItem, forms.FloatFormItem, forms.DateFormItem,
+    forms.DateTimeFormItem, forms.MenuItemFormItem, forms.MenuFormItemMeta,
+    forms.MenuFormItem, forms.FormMeta, forms.Form,
+    Response,
+)
+
+METHODS = ('__init__', 'as_data', 'as_json', 'as_json_bytes')
+
+
+class Counters(object):
+    __slots__ = ('construct', 'items', 'as_data_calls', 'as_data_time',
+                 'as_json_calls', 'as_json_time', 'bytes')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Stats(object):
+    """ Counters per class name """
+    def __init__(self):
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, event, name, value):
+        with self._lock:
+            try:
+                counters = self.counters[name]
+            except KeyError:
+                counters = self.counters[name] = Counters()
+
+            if event == 'construct':
+                counters.construct += value
+            elif event == 'items':
+                counters.items += value
+            elif event == 'as_data':
+                counters.as_data_calls += 1
+                counters.as_data_time += value
+            elif event == 'as_json':
+                counters.as_json_calls += 1
+                counters.as_json_time += value
+            elif event == 'bytes':
+                counters.bytes += value
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+
+    def as_dict(self):
+        with self._lock:
+            return {name: counters.as_dict()
+                    for name, counters in self.counters.items()}
+
+
+STATS = Stats()
+
+_hooks = []
+_originals = {}
+# enable() calls and open profiles, the methods are wrapped while > 0
+_enabled = 0
+_recording = 0
+_enable_lock = threading.Lock()
+_local = threading.local()
+# Stats of the innermost profile() block of the current context
+_profile = contextvars.ContextVar('onem_profile', default=None)
+
+
+def add_hook(callback):
+    """
+    Registers ``callback(event, class_name, value)`` called on every
+    recorded event while instrumentation is enabled
+    """
+    _hooks.append(callback)
+
+
+def remove_hook(callback):
+    _hooks.remove(callback)
+
+
+def _emit(event, name, value, profile_stats):
+    if profile_stats is not None:
+        profile_stats.record(event, name, value)
+    if _recording:
+        STATS.record(event, name, value)
+        for hook in list(_hooks):
+            hook(event, name, value)
+
+
+def _output_size(output):
+    if isinstance(output, str):
+        return len(output) if output.isascii() else len(output.encode())
+    return len(output)
+
+
+def _enter(obj, method):
+    """
+    Returns False when called again for the same object and method, that
+    is through ``super()``, so a call is only recorded once
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if stack and stack[-1] == (id(obj), method):
+        return False
+    stack.append((id(obj), method))
+    return True
+
+
+def _exit():
+    _local.stack.pop()
+
+
+def _wrap(method, func):
+    if method == '__init__':
+        def wrapper(self, *args, **kws):
+            profile_stats = _profile.get()
+            if (profile_stats is None and not _recording) or not _enter(
+                    self, method):
+                return func(self, *args, **kws)
+            try:
+                func(self, *args, **kws)
+            finally:
+                _exit()
+            name = self.__class__.__name__
+            _emit('construct', name, 1, profile_stats)
+            body = getattr(self, 'items', None)
+            if body is None:
+                body = getattr(self, 'body', None)
+            if body is not None:
+                _emit('items', name, len(body), profile_stats)
+    else:
+        event = 'as_data' if method == 'as_data' else 'as_json'
+
+        def wrapper(self, *args, **kws):
+            profile_stats = _profile.get()
+            if (profile_stats is None and not _recording) or not _enter(
+                    self, method):
+                return func(self, *args, **kws)
+            start = time.perf_counter()
+            try:
+                result = func(self, *args, **kws)
+            finally:
+                _exit()
+            elapsed = time.perf_counter() - start
+            name = self.__class__.__name__
+            _emit(event, name, elapsed, profile_stats)
+            if event == 'as_json':
+                _emit('bytes', name, _output_size(result), profile_stats)
+            return result
+
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def is_enabled():
+    """ Returns whether the methods are wrapped (enabled or profiling) """
+    return _enabled > 0
+
+
+def _wrap_class(cls):
+    for method in METHODS:
+        func = cls.__dict__.get(method)
+        if func is None:
+            continue
+        _originals[(cls, method)] = func
+        setattr(cls, method, _wrap(method, func))
+
+
+def _wrap_frozen_class(cls):
+    with _enable_lock:
+        if _enabled and (cls, 'as_json') not in _originals:
+            _wrap_class(cls)
+
+
+def _acquire():
+    global _enabled
+    _enabled += 1
+    if _enabled > 1:
+        return
+    for cls in CLASSES + tuple(frozen._CLASSES.values()):
+        _wrap_class(cls)
+    frozen._class_hooks.append(_wrap_frozen_class)
+
+
+def _release():
+    global _enabled
+    _enabled -= 1
+    if _enabled > 0:
+        return
+    frozen._class_hooks.remove(_wrap_frozen_class)
+    for (cls, method), func in _originals.items():
+        setattr(cls, method, func)
+    _originals.clear()
+
+
+def enable():
+    """
+    Starts recording in ``STATS`` and the hooks. Calls are counted,
+    instrumentation stays enabled until ``disable()`` was called as many
+    times.
+    """
+    global _recording
+    with _enable_lock:
+        _recording += 1
+        _acquire()
+
+
+def disable():
+    """ Stops recording and restores the original methods """
+    global _recording
+    with _enable_lock:
+        if _recording == 0:
+            return
+        _recording -= 1
+        _release()
+
+
+@contextlib.contextmanager
+def profile():
+    """
+    Wraps the methods for the block and yields a Stats instance collecting
+    the events of the current context only
+    """
+    stats = Stats()
+    with _enable_lock:
+        _acquire()
+    token = _profile.set(stats)
+    try:
+        yield stats
+    finally:
+        _profile.reset(token)
+        with _enable_lock:
+            _release()
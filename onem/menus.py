@@ -1,9 +1,15 @@
-import json
+import itertools
+import urllib.parse
 
-from onem.common import sanitize_method, sanitize_url
+from onem.common import (FreezableMixin, ItemColumns, JSONMixin,
+                         StreamableMixin, column, from_attrs, json_value,
+                         sanitize_method, sanitize_methods, sanitize_url,
+                         sanitize_urls)
 
 
-class MenuItem(object):
+class MenuItem(JSONMixin):
+    __slots__ = ('is_option', 'label', 'url', 'method', 'text_search')
+
     def __init__(self, label, url=None, method=None, is_option=True,
                  text_search=None):
         """
@@ -31,6 +37,26 @@ class MenuItem(object):
         self.method = sanitize_method(method)
         self.text_search = text_search
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds the item out of its ``as_data()`` dict
+
+        :param trusted: skip the validation for data produced by this library
+        """
+        is_option = data['type'] == 'option'
+        if trusted:
+            return from_attrs(cls, {
+                'is_option': is_option,
+                'label': data['description'],
+                'url': data.get('path'),
+                'method': data.get('method'),
+                'text_search': data.get('text_search'),
+            })
+        return cls(data['description'], url=data.get('path'),
+                   method=data.get('method'), is_option=is_option,
+                   text_search=data.get('text_search'))
+
     def as_data(self):
         return {
             'description': self.label,
@@ -40,12 +66,89 @@ class MenuItem(object):
             'text_search': self.text_search
         }
 
-    def as_json(self):
-        return json.dumps(self.as_data())
 
+class MenuItemColumns(ItemColumns):
+    __slots__ = ('labels', 'urls', 'methods', 'is_option', 'text_search')
+    item_class = MenuItem
+
+    def __init__(self, labels, urls=None, methods=None, is_option=None,
+                 text_search=None):
+        """
+        Column based sequence of MenuItem, see MenuItem for the meaning of
+        each column. Every column is validated in one pass and content rows
+        (``is_option`` False) get no url, method nor text_search.
+
+        :param labels: sequence (or NumPy array) of labels
+        :param urls: sequence of url paths, None for no urls
+        :param methods: sequence of methods, None for ``GET`` everywhere
+        :param is_option: sequence of bools, None for options only
+        :param text_search: sequence of search strings, None for no search
+        """
+        labels = column(labels)
+        size = len(labels)
+
+        if is_option is None:
+            is_option = (True,) * size
+        else:
+            is_option = tuple([bool(v) for v in column(is_option, size)])
+
+        urls = (None,) * size if urls is None else column(urls, size)
+        methods = (None,) * size if methods is None else column(methods, size)
+        text_search = ((None,) * size if text_search is None
+                       else column(text_search, size))
+
+        if all(is_option):
+            urls = sanitize_urls(urls)
+            methods = sanitize_methods(methods)
+        else:
+            # as MenuItem, content rows are blanked without being validated
+            def options_only(values):
+                return tuple([v if option else None
+                              for v, option in zip(values, is_option)])
 
-class MenuMeta(object):
+            urls = sanitize_urls(options_only(urls))
+            methods = options_only(sanitize_methods(options_only(methods)))
+            text_search = options_only(text_search)
+
+        self._set_columns(labels=labels, urls=urls, methods=methods,
+                          is_option=is_option, text_search=text_search)
+
+    def item(self, index):
+        item = MenuItem.__new__(MenuItem)
+        item.label = self.labels[index]
+        item.url = self.urls[index]
+        item.method = self.methods[index]
+        item.is_option = self.is_option[index]
+        item.text_search = self.text_search[index]
+        return item
+
+    def as_data(self):
+        return [{
+            'description': label,
+            'method': method,
+            'path': url,
+            'type': 'option' if option else 'content',
+            'text_search': text_search,
+        } for label, url, method, option, text_search in zip(
+            self.labels, self.urls, self.methods, self.is_option,
+            self.text_search)]
+
+    def iter_json_items(self):
+        for label, url, method, option, text_search in zip(
+                self.labels, self.urls, self.methods, self.is_option,
+                self.text_search):
+            yield ''.join((
+                '{"description": ', json_value(label),
+                ', "method": ', json_value(method),
+                ', "path": ', json_value(url),
+                ', "type": ', '"option"' if option else '"content"',
+                ', "text_search": ', json_value(text_search), '}'))
+
+
+class MenuMeta(FreezableMixin):
     """ Meta information for a Menu object """
+    __slots__ = ('auto_select',)
+
     def __init__(self, auto_select=True):
         """
         :param auto_select: if there is one option in the menu, this parameter
@@ -54,16 +157,22 @@ class MenuMeta(object):
         assert(isinstance(auto_select, bool))
         self.auto_select = auto_select
 
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        return cls(auto_select=data['auto_select'])
+
     def as_data(self):
         return {
             'auto_select': self.auto_select,
         }
 
 
-class Menu(object):
+class Menu(StreamableMixin):
+    content_type = 'menu'
+
     def __init__(self, body, header=None, footer=None, meta=None):
         """
-        :param body: sequence of MenuItem instances
+        :param body: sequence of MenuItem instances or MenuItemColumns
         :param header: string displayed in the header
         :param footer: string displayed in the footer
         :param meta: MenuMeta instance
@@ -71,9 +180,10 @@ class Menu(object):
         self.header = header
         self.footer = footer
 
-        assert isinstance(body, (list, tuple))
-        for item in body:
-            assert isinstance(item, MenuItem)
+        if not isinstance(body, MenuItemColumns):
+            assert isinstance(body, (list, tuple))
+            for item in body:
+                assert isinstance(item, MenuItem)
 
         self.body = body
 
@@ -83,14 +193,124 @@ class Menu(object):
 
         assert isinstance(self.meta, MenuMeta)
 
+    @classmethod
+    def from_columns(cls, labels, urls=None, methods=None, is_option=None,
+                     text_search=None, **kws):
+        """
+        Builds a Menu out of columns without creating one MenuItem per row,
+        see MenuItemColumns for the columns and Menu for ``kws``
+        """
+        return cls(MenuItemColumns(labels, urls=urls, methods=methods,
+                                   is_option=is_option,
+                                   text_search=text_search), **kws)
+
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds the menu out of its ``as_data()`` dict
+
+        :param trusted: skip the validation for data produced by this library
+        """
+        body = [MenuItem.from_data(item, trusted=trusted)
+                for item in data['body']]
+        meta = data.get('meta')
+        if meta is not None:
+            meta = MenuMeta.from_data(meta, trusted=trusted)
+
+        if trusted:
+            return from_attrs(cls, {'header': data.get('header'),
+                                    'footer': data.get('footer'),
+                                    'body': body,
+                                    'meta': meta})
+        return cls(body, header=data.get('header'),
+                   footer=data.get('footer'), meta=meta)
+
     def as_data(self):
+        if isinstance(self.body, ItemColumns):
+            body = self.body.as_data()
+        else:
+            body = [item.as_data() for item in self.body]
+
         return {
-            'type': 'menu',
+            'type': self.content_type,
             'header': self.header,
             'footer': self.footer,
-            'body': [item.as_data() for item in self.body],
+            'body': body,
             'meta': self.meta.as_data() if self.meta else None,
         }
 
-    def as_json(self):
-        return json.dumps(self.as_data())
+
+class PaginatedMenu(Menu):
+    def __init__(self, source, url, page=1, page_size=10, item_factory=None,
+                 next_label='Next', previous_label='Previous', **kws):
+        """
+        Menu showing a single page of a possibly huge result set. Only the
+        rows of the requested page are fetched, built and validated.
+
+        :param source: the rows; either a sequence, an iterable (i.e. a
+            generator or a database cursor) or a callable taking
+            ``(offset, limit)`` and returning the rows of that window
+        :param url: callback url path of this menu, the page number is
+            appended to it as the ``page`` query string parameter
+        :param page: 1-based page number
+        :param page_size: number of rows per page
+        :param item_factory: callable building a MenuItem out of a row, if
+            None the rows must be MenuItem instances
+        :param next_label: label of the item linking to the next page
+        :param previous_label: label of the item linking to the previous page
+        :param kws: header, footer and meta, see Menu
+        """
+        assert isinstance(page, int) and page >= 1
+        assert isinstance(page_size, int) and page_size >= 1
+
+        self.url = sanitize_url(url)
+        self.page = page
+        self.page_size = page_size
+
+        offset = (page - 1) * page_size
+        # one extra row tells whether there is a next page
+        rows = list(self._fetch(source, offset, page_size + 1))
+
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if item_factory is not None:
+            body = [item_factory(row) for row in rows]
+        else:
+            body = rows
+
+        if self.has_next:
+            body.append(MenuItem(next_label, self.page_url(page + 1)))
+        if page > 1:
+            body.append(MenuItem(previous_label, self.page_url(page - 1)))
+
+        super(PaginatedMenu, self).__init__(body, **kws)
+
+    @classmethod
+    def from_data(cls, data, trusted=False):
+        """
+        Rebuilds a plain Menu out of the ``as_data()`` dict, which holds the
+        rows of the page only
+        """
+        return Menu.from_data(data, trusted=trusted)
+
+    @staticmethod
+    def _fetch(source, offset, limit):
+        if callable(source):
+            return source(offset, limit)
+        if isinstance(source, (list, tuple)):
+            return source[offset:offset + limit]
+        return itertools.islice(source, offset, offset + limit)
+
+    def page_url(self, page):
+        """
+        Returns the callback url path of the given page, the ``page``
+        parameter of ``url`` if any is replaced
+        """
+        parts = urllib.parse.urlsplit(self.url)
+        query = [(name, value) for name, value
+                 in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                 if name != 'page']
+        query.append(('page', page))
+        return urllib.parse.urlunsplit(
+            parts._replace(query=urllib.parse.urlencode(query)))
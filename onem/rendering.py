@@ -0,0 +1,328 @@
+"""
+Text rendering of menus and forms as shown on a handset, with the SMS
+segments and USSD pages they take.
+
+Option items get a marker, letters for menus and for menu form items unless
+their meta is ``numbered``, content items are shown as is::
+
+    text = rendering.render(menu)
+    text.lines     # ['Header', 'A First', 'B Second', 'Footer']
+    text.encoding  # 'GSM-7' or 'UCS-2'
+    text.segments  # number of SMS segments
+    text.pages()   # USSD pages, with the chunking footer
+
+    rendering.trim(menu, max_segments=1)  # Menu keeping the first options
+
+Text made only of GSM 03.38 characters is sent as GSM-7: 160 septets in a
+single SMS, 153 per segment of a concatenated one, extension table
+characters taking two septets. Any other character switches the whole text to
+UCS-2: 70 UTF-16 code units in a single SMS, 67 per segment.
+"""
+import re
+
+from onem import common, forms, frozen, menus
+
+
+GSM_BASIC = (
+    '@£$¥èéùìòÇ\nØø\r'
+    'ÅåΔ_ΦΓΛΩΠΨΣΘ'
+    'ΞÆæßÉ !"#¤%&\'()*+,-./0123456789:;<=>?'
+    '¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿'
+    'abcdefghijklmnopqrstuvwxyzäöñüà'
+)
+GSM_EXTENSION = '\f^{}\\[~]|€'
+
+GSM7 = 'GSM-7'
+UCS2 = 'UCS-2'
+
+# (single message, concatenated segment) sizes in septets or UTF-16 units
+SMS_SIZES = {GSM7: (160, 153), UCS2: (70, 67)}
+# USSD page sizes in characters
+USSD_SIZES = {GSM7: 182, UCS2: 80}
+
+CHUNKING_FOOTER = 'Reply MORE for more'
+
+_NOT_GSM_RE = re.compile(
+    '[^' + re.escape(GSM_BASIC + GSM_EXTENSION) + ']')
+_EXTENSION_RE = re.compile('[' + re.escape(GSM_EXTENSION) + ']')
+_ASTRAL_RE = re.compile('[\U00010000-\U0010ffff]')
+
+
+def encoding(text):
+    """ Returns ``GSM7`` if ``text`` can be sent as GSM-7 else ``UCS2`` """
+    return UCS2 if _NOT_GSM_RE.search(text) else GSM7
+
+
+def length(text, text_encoding=None):
+    """
+    Returns the size of ``text`` in septets (GSM-7) or UTF-16 code units
+    (UCS-2)
+    """
+    if text_encoding is None:
+        text_encoding = encoding(text)
+    if text_encoding == GSM7:
+        return len(text) + len(_EXTENSION_RE.findall(text))
+    return len(text) + len(_ASTRAL_RE.findall(text))
+
+
+def _char_length(c, text_encoding):
+    if text_encoding == GSM7:
+        return 2 if c in GSM_EXTENSION else 1
+    return 2 if ord(c) > 0xffff else 1
+
+
+def _truncate(text, size, text_encoding):
+    """ Returns the longest beginning of ``text`` of at most ``size`` """
+    if length(text, text_encoding) == len(text):
+        return text[:size]
+    used = 0
+    for i, c in enumerate(text):
+        used += _char_length(c, text_encoding)
+        if used > size:
+            return text[:i]
+    return text
+
+
+def split_sms(text):
+    """
+    Returns the SMS segments of ``text``. Escaped GSM-7 characters and
+    surrogate pairs are never split across two segments.
+    """
+    text_encoding = encoding(text)
+    single, segment = SMS_SIZES[text_encoding]
+    if length(text, text_encoding) <= single:
+        return [text]
+
+    parts = []
+    start = 0
+    size = 0
+    for i, c in enumerate(text):
+        n = _char_length(c, text_encoding)
+        if size + n > segment:
+            parts.append(text[start:i])
+            start = i
+            size = 0
+        size += n
+    parts.append(text[start:])
+    return parts
+
+
+def segments(text):
+    """ Returns the number of SMS segments of ``text`` """
+    text_encoding = encoding(text)
+    single, segment = SMS_SIZES[text_encoding]
+    size = length(text, text_encoding)
+    if size <= single:
+        return 1
+    if size == len(text):
+        # no two unit characters, every segment is full but the last
+        return -(-size // segment)
+    return len(split_sms(text))
+
+
+def marker(index, numbered=False):
+    """ Returns the marker of the ``index``th option: A..Z, AA.. or 1.. """
+    if numbered:
+        return str(index + 1)
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _rows(body):
+    if isinstance(body, common.ItemColumns):
+        return zip(body.labels, body.is_option)
+    return ((item.label, item.is_option) for item in body)
+
+
+def _body_lines(body, numbered=False):
+    lines = []
+    index = 0
+    for label, is_option in _rows(body):
+        label = '' if label is None else str(label)
+        if is_option:
+            lines.append(f'{marker(index, numbered)} {label}')
+            index += 1
+        else:
+            lines.append(label)
+    return lines
+
+
+class Rendering(object):
+    def __init__(self, body, header=None, footer=None,
+                 chunking_footer=CHUNKING_FOOTER):
+        """
+        :param body: list of body lines
+        :param header: header line, None for no header
+        :param footer: footer line, None for no footer
+        :param chunking_footer: line ending every USSD page but the last
+        """
+        self.header = header
+        self.body = body
+        self.footer = footer
+        self.chunking_footer = chunking_footer or CHUNKING_FOOTER
+
+    @property
+    def lines(self):
+        lines = [self.header] if self.header is not None else []
+        lines.extend(self.body)
+        if self.footer is not None:
+            lines.append(self.footer)
+        return lines
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+    @property
+    def encoding(self):
+        return encoding(self.text)
+
+    @property
+    def length(self):
+        return length(self.text)
+
+    @property
+    def segments(self):
+        return segments(self.text)
+
+    def split_sms(self):
+        return split_sms(self.text)
+
+    def fits(self, max_segments=1):
+        return self.segments <= max_segments
+
+    def pages(self, page_size=None):
+        """
+        Returns the text of the USSD pages: every page repeats the header,
+        the body lines are packed in as few pages as possible, every page
+        but the last ends with the chunking footer and the last one with the
+        footer. Body lines longer than a page fill the room left on the
+        current page and go on on the next ones.
+
+        :param page_size: defaults to ``USSD_SIZES`` for the text encoding
+        """
+        text_encoding = encoding('\n'.join(
+            self.lines + [self.chunking_footer]))
+        if page_size is None:
+            page_size = USSD_SIZES[text_encoding]
+
+        def size(line):
+            return length(line, text_encoding) + 1  # newline
+
+        header = [self.header] if self.header is not None else []
+        footer = [self.footer] if self.footer is not None else []
+        base = sum(size(line) for line in header) - 1
+        last_room = page_size - base - sum(size(line) for line in footer)
+        room = page_size - base - size(self.chunking_footer)
+        # room for at least one two unit character and its newline
+        if room < 3 or last_room < 0:
+            raise Exception(f'Header and footer do not fit in a page of '
+                            f'{page_size} characters')
+
+        lines = list(self.body)
+        sizes = [size(line) for line in lines]
+        remaining = sum(sizes)
+        if remaining <= last_room:
+            return ['\n'.join(header + lines + footer)]
+
+        pages = []
+        start = 0
+        while True:
+            # the remaining lines (if any) fit in the last page with the
+            # footer
+            if remaining <= last_room:
+                pages.append(header + lines[start:] + footer)
+                break
+            used = 0
+            end = start
+            while end < len(lines) and used + sizes[end] <= room:
+                used += sizes[end]
+                end += 1
+            page_body = lines[start:end]
+            if end < len(lines) and sizes[end] > room and room - used > 1:
+                # the line never fits in a page, split it
+                line = lines[end]
+                head = _truncate(line, room - used - 1, text_encoding)
+                if head:
+                    page_body.append(head)
+                    used += size(head)
+                    lines[end] = line[len(head):]
+                    sizes[end] = size(lines[end])
+                    remaining += 1  # one more newline
+            pages.append(header + page_body + [self.chunking_footer])
+            remaining -= used
+            start = end
+        return ['\n'.join(page) for page in pages]
+
+
+def render_menu(menu):
+    """ Returns the Rendering of a Menu """
+    return Rendering(_body_lines(menu.body), header=menu.header,
+                     footer=menu.footer)
+
+
+def render_form_item(item, form=None):
+    """
+    Returns the Rendering of a form item as shown while filling ``form``,
+    whose header and footer are used when the item has none
+    """
+    header = item.header
+    footer = item.footer
+    if form is not None:
+        header = form.header if header is None else header
+        footer = form.footer if footer is None else footer
+
+    body = [] if item.label is None else [item.label]
+    if isinstance(item, forms.MenuFormItem):
+        numbered = item.meta is not None and item.meta.numbered
+        body.extend(_body_lines(item.body, numbered))
+    return Rendering(body, header=header, footer=footer,
+                     chunking_footer=item.chunking_footer)
+
+
+def render_form(form):
+    """ Returns the Rendering of every visible item of a Form in order """
+    return [render_form_item(item, form) for item in form.items
+            if not isinstance(item, forms.HiddenFormItem)]
+
+
+def render(obj):
+    """
+    Returns the Rendering of a Menu, form item or Response holding a Menu,
+    or the list of Renderings of a Form (or Response holding a Form)
+    """
+    obj = getattr(obj, 'object', obj)  # Response
+    if isinstance(obj, menus.Menu):
+        return render_menu(obj)
+    if isinstance(obj, forms.Form):
+        return render_form(obj)
+    if isinstance(obj, forms.BaseFormItem):
+        return render_form_item(obj)
+    raise Exception(f'Can not render {obj.__class__.__name__}')
+
+
+def trim(obj, max_segments=1):
+    """
+    Returns a copy of the Menu or MenuFormItem ``obj`` keeping the longest
+    beginning of its body that renders in ``max_segments`` SMS segments
+    (``obj`` itself when it already fits)
+    """
+    def fits(n):
+        copy = frozen.replace(obj, body=list(obj.body[:n]))
+        return render(copy).fits(max_segments)
+
+    if render(obj).fits(max_segments):
+        return obj
+
+    low, high = 0, len(obj.body)  # fits(low), not fits(high)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle
+    return frozen.replace(obj, body=list(obj.body[:low]))
@@ -0,0 +1,310 @@
+"""
+Validation of Response/Menu/Form payloads against the shapes accepted by the
+ONEm platform.
+
+The shapes below are compiled once, at import time, into straight-line check
+functions. The first invalid field raises a SchemaError holding the path to
+it, i.e. ``content.body[3].validation.min_length``::
+
+    schema.validate(response.as_data())
+
+Unknown keys are ignored.
+"""
+from onem.common import ALLOWED_METHODS
+from onem.forms import FormItemType
+
+
+class SchemaError(Exception):
+    def __init__(self, message, path=None):
+        """
+        :param message: what is wrong with the field
+        :param path: list of keys and indexes leading to the field
+        """
+        super(SchemaError, self).__init__(message)
+        self.message = message
+        self.path = path or []
+
+    @property
+    def location(self):
+        location = ''
+        for part in self.path:
+            if isinstance(part, int):
+                location += f'[{part}]'
+            else:
+                location += f'.{part}' if location else part
+        return location
+
+    def __str__(self):
+        return f'{self.location}: {self.message}'
+
+
+# Field checks: python expression testing ``v`` and the error message
+CHECKS = {
+    'any': (None, None),
+    'str': ('isinstance(v, str)', 'must be a string'),
+    'str?': ('v is None or isinstance(v, str)', 'must be a string or null'),
+    'bool': ('v is True or v is False', 'must be a boolean'),
+    'int?': ('v is None or (isinstance(v, int) and v is not True '
+             'and v is not False)', 'must be an integer or null'),
+    'number?': ('v is None or (isinstance(v, (int, float)) and v is not True '
+                'and v is not False)', 'must be a number or null'),
+    'path': ('isinstance(v, str) and v.startswith("/")',
+             'must be a url path starting with "/"'),
+    'path?': ('v is None or (isinstance(v, str) and v.startswith("/"))',
+              'must be a url path starting with "/" or null'),
+    'method': ('v in _METHODS', f'must be one of {ALLOWED_METHODS}'),
+    'method?': ('v is None or v in _METHODS',
+                f'must be one of {ALLOWED_METHODS} or null'),
+    'item_type': ('v == "option" or v == "content"',
+                  'must be "option" or "content"'),
+}
+
+MENU_ITEM = [
+    ('description', 'str?'),
+    ('method', 'method?'),
+    ('path', 'path?'),
+    ('type', 'item_type'),
+    ('text_search', 'str?'),
+]
+
+MENU_META = [
+    ('auto_select', 'bool'),
+]
+
+MENU = [
+    ('type', ('const', 'menu')),
+    ('header', 'str?'),
+    ('footer', 'str?'),
+    ('body', ('list', 'menu_item')),
+    ('meta', ('object?', 'menu_meta')),
+]
+
+VALIDATION = [
+    ('url', 'path?'),
+    ('type_error', 'str?'),
+    ('type_error_footer', 'str?'),
+]
+
+
+def _form_item(item_type, validation=(), extra=()):
+    return [
+        ('name', 'str'),
+        ('type', ('const', item_type)),
+        ('chunking_footer', 'str?'),
+        ('confirmation_label', 'str?'),
+        ('editable', 'bool'),
+        ('footer', 'str?'),
+        ('header', 'str?'),
+        ('description', 'str?'),
+        ('method', 'method?'),
+        ('required', 'bool'),
+        ('status_exclude', 'bool'),
+        ('status_prepend', 'bool'),
+        ('url', 'path?'),
+        ('validation', ('dict', VALIDATION + list(validation))),
+    ] + list(extra)
+
+
+LENGTH_VALIDATION = [
+    ('min_length', 'int?'),
+    ('min_length_error', 'str?'),
+    ('max_length', 'int?'),
+    ('max_length_error', 'str?'),
+]
+
+VALUE_VALIDATION = [
+    ('min_value', 'number?'),
+    ('min_value_error', 'str?'),
+    ('max_value', 'number?'),
+    ('max_value_error', 'str?'),
+]
+
+FORM_MENU_OPTION = [
+    ('description', 'str?'),
+    ('type', 'item_type'),
+    ('text_search', 'str?'),
+    ('value', 'any'),
+]
+
+FORM_MENU_META = [
+    ('auto_select', 'bool'),
+    ('multi_select', 'bool'),
+    ('numbered', 'bool'),
+]
+
+FORM_META = [
+    ('completion_status_show', 'bool'),
+    ('completion_status_in_header', 'bool'),
+    ('confirmation_needed', 'bool'),
+]
+
+FORM = [
+    ('type', ('const', 'form')),
+    ('header', 'str?'),
+    ('footer', 'str?'),
+    ('body', ('list', 'form_item')),
+    ('meta', ('object?', 'form_meta')),
+    ('path', 'path'),
+    ('method', 'method'),
+]
+
+SHAPES = {
+    'menu_item': MENU_ITEM,
+    'menu_meta': MENU_META,
+    'menu': MENU,
+    'string_item': _form_item(FormItemType.STRING, LENGTH_VALIDATION),
+    'hidden_item': _form_item(FormItemType.STRING, extra=[
+        ('hidden', ('const', True)),
+        ('value', 'any'),
+    ]),
+    'int_item': _form_item(FormItemType.INT, VALUE_VALIDATION),
+    'float_item': _form_item(FormItemType.FLOAT, VALUE_VALIDATION),
+    'date_item': _form_item(FormItemType.DATE),
+    'datetime_item': _form_item(FormItemType.DATETIME),
+    'form_menu_option': FORM_MENU_OPTION,
+    'form_menu_meta': FORM_MENU_META,
+    'menu_form_item': _form_item(FormItemType.MENU, extra=[
+        ('meta', ('object?', 'form_menu_meta')),
+        ('body', ('list', 'form_menu_option')),
+    ]),
+    'form_meta': FORM_META,
+    'form': FORM,
+}
+
+# nested object, list and dict fields of each shape
+NESTED = {
+    name: {key: check for key, check in fields
+           if isinstance(check, tuple) and check[0] != 'const'}
+    for name, fields in SHAPES.items()
+}
+
+
+def _compile_fields(fields, var, lines, indent):
+    pad = ' ' * indent
+    lines.append(f'{pad}if {var}.__class__ is not dict:')
+    lines.append(f'{pad}    raise SchemaError("must be an object")')
+    for key, check in fields:
+        lines.append(f'{pad}v = {var}.get({key!r}, _MISSING)')
+        lines.append(f'{pad}if v is _MISSING:')
+        lines.append(f'{pad}    raise SchemaError("is missing", [{key!r}])')
+        if isinstance(check, str):
+            expr, message = CHECKS[check]
+            if expr is not None:
+                lines.append(f'{pad}if not ({expr}):')
+                lines.append(f'{pad}    raise SchemaError({message!r}, '
+                             f'[{key!r}])')
+            continue
+
+        kind, arg = check
+        if kind == 'const':
+            lines.append(f'{pad}if v != {arg!r}:')
+            lines.append(f'{pad}    raise SchemaError("must be {arg!r}", '
+                         f'[{key!r}])')
+        elif kind in ('object?', 'list'):
+            if kind == 'object?':
+                lines.append(f'{pad}if v is not None:')
+                lines.append(f'{pad}    try:')
+                lines.append(f'{pad}        check_{arg}(v)')
+                lines.append(f'{pad}    except SchemaError as e:')
+                lines.append(f'{pad}        e.path.insert(0, {key!r})')
+                lines.append(f'{pad}        raise')
+            else:
+                lines.append(f'{pad}if v.__class__ is not list '
+                             f'and v.__class__ is not tuple:')
+                lines.append(f'{pad}    raise SchemaError("must be a list", '
+                             f'[{key!r}])')
+                lines.append(f'{pad}for i, item in enumerate(v):')
+                lines.append(f'{pad}    try:')
+                lines.append(f'{pad}        check_{arg}(item)')
+                lines.append(f'{pad}    except SchemaError as e:')
+                lines.append(f'{pad}        e.path[0:0] = [{key!r}, i]')
+                lines.append(f'{pad}        raise')
+        elif kind == 'dict':
+            nested = f'd_{key}'
+            lines.append(f'{pad}{nested} = v')
+            lines.append(f'{pad}try:')
+            _compile_fields(arg, nested, lines, indent + 4)
+            lines.append(f'{pad}except SchemaError as e:')
+            lines.append(f'{pad}    e.path.insert(0, {key!r})')
+            lines.append(f'{pad}    raise')
+        else:
+            raise Exception(f'Invalid check: {check}')
+
+
+def compile_shape(name, fields, namespace):
+    lines = [f'def check_{name}(d):']
+    _compile_fields(fields, 'd', lines, 4)
+    exec(compile('\n'.join(lines) + '\n', f'<onem schema {name}>', 'exec'),
+         namespace)
+    return namespace[f'check_{name}']
+
+
+_FORM_ITEM_SHAPES = {
+    FormItemType.STRING: 'string_item',
+    FormItemType.INT: 'int_item',
+    FormItemType.FLOAT: 'float_item',
+    FormItemType.DATE: 'date_item',
+    FormItemType.DATETIME: 'datetime_item',
+    FormItemType.MENU: 'menu_form_item',
+}
+
+
+def form_item_shape(d):
+    """ Returns the shape name of the form item dict ``d`` or None """
+    if d.get('hidden'):
+        return 'hidden_item'
+    return _FORM_ITEM_SHAPES.get(d.get('type'))
+
+
+def check_form_item(d):
+    if d.__class__ is not dict:
+        raise SchemaError('must be an object')
+    shape = form_item_shape(d)
+    if shape is None:
+        raise SchemaError(f'must be one of {list(_FORM_ITEM_SHAPES)}',
+                          ['type'])
+    return _namespace[f'check_{shape}'](d)
+
+
+_namespace = {
+    'SchemaError': SchemaError,
+    '_MISSING': object(),
+    '_METHODS': frozenset(ALLOWED_METHODS),
+    'check_form_item': check_form_item,
+}
+for _name, _fields in SHAPES.items():
+    compile_shape(_name, _fields, _namespace)
+
+validate_menu = _namespace['check_menu']
+validate_form = _namespace['check_form']
+
+_CONTENT_CHECKS = {'menu': validate_menu, 'form': validate_form}
+
+
+def validate_response(d):
+    if d.__class__ is not dict:
+        raise SchemaError('must be an object')
+    check = _CONTENT_CHECKS.get(d.get('content_type'))
+    if check is None:
+        raise SchemaError(f'must be one of {list(_CONTENT_CHECKS)}',
+                          ['content_type'])
+    content = d.get('content')
+    if content.__class__ is dict and content.get('type') != d['content_type']:
+        raise SchemaError('must match content_type', ['content', 'type'])
+    try:
+        check(content)
+    except SchemaError as e:
+        e.path.insert(0, 'content')
+        raise
+
+
+def validate(payload):
+    """
+    Raises SchemaError if ``payload``, the ``as_data()`` of a Response, Menu
+    or Form, isn't accepted by the ONEm platform
+    """
+    if payload.__class__ is dict and 'content_type' in payload:
+        return validate_response(payload)
+    if payload.__class__ is dict and payload.get('type') == 'form':
+        return validate_form(payload)
+    return validate_menu(payload)
@@ -0,0 +1,116 @@
+"""
+Inverted index over the ``text_search`` (or ``label``) of the option items of
+a Menu or MenuFormItem body.
+
+The index is built once and can be shared between requests and threads::
+
+    index = SearchIndex(products_menu)
+    index.narrow('choc bar')  # Menu with the matching options only
+
+Text is case and accent folded and split into word tokens. Every query token
+must match the beginning of a word of the item (prefix match). Query tokens of
+at least 3 characters which don't prefix any word fall back to a substring
+match through a trigram index over the vocabulary.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+from onem import frozen
+
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """ Returns ``text`` lower cased and stripped of accents """
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text))
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex(object):
+    def __init__(self, source):
+        """
+        :param source: Menu or MenuFormItem instance whose body is indexed
+        """
+        self.source = source
+        self.items = tuple(source.body)
+
+        postings = {}
+        for pos, item in enumerate(self.items):
+            if not item.is_option:
+                continue
+            text = item.text_search if item.text_search else item.label
+            for token in set(tokenize(text or '')):
+                postings.setdefault(token, []).append(pos)
+
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+        trigrams = {}
+        for token in self.vocabulary:
+            for trigram in _trigrams(token):
+                trigrams.setdefault(trigram, set()).add(token)
+        self.trigrams = trigrams
+
+    def _prefixed(self, prefix):
+        vocabulary = self.vocabulary
+        i = bisect_left(vocabulary, prefix)
+        tokens = []
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            tokens.append(vocabulary[i])
+            i += 1
+        return tokens
+
+    def _containing(self, part):
+        if len(part) < 3:
+            return []
+        candidates = None
+        for trigram in _trigrams(part):
+            tokens = self.trigrams.get(trigram)
+            if not tokens:
+                return []
+            candidates = (tokens if candidates is None
+                          else candidates & tokens)
+        return [token for token in candidates if part in token]
+
+    def _matching(self, query_token):
+        tokens = self._prefixed(query_token) or self._containing(query_token)
+        positions = set()
+        for token in tokens:
+            positions.update(self.postings[token])
+        return positions
+
+    def positions(self, query):
+        """ Returns the sorted body positions of the items matching query """
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not tokens:
+            return []
+
+        result = None
+        for token in tokens:
+            matching = self._matching(token)
+            result = matching if result is None else result & matching
+            if not result:
+                return []
+        return sorted(result)
+
+    def search(self, query):
+        """ Returns the body items matching ``query`` in their body order """
+        items = self.items
+        return [items[pos] for pos in self.positions(query)]
+
+    def narrow(self, query):
+        """
+        Returns a copy of the indexed Menu or MenuFormItem whose body only
+        contains the items matching ``query``
+        """
+        return frozen.replace(self.source, body=self.search(query))
@@ -0,0 +1,368 @@
+"""
+Local stand-in for the ONEm platform to load test callback services.
+
+Every simulated session starts with a ``GET`` of the start path and then
+walks the returned responses the way a user would:
+
+- menus: one of the ``option`` items with a path is chosen and its path is
+  requested with its method
+- forms: every item is answered in order (see ``answer``) and the answers
+  are submitted to the form path with the form method, as query string
+  parameters for ``GET`` and as a JSON object body otherwise
+
+A session stops after ``max_steps`` requests, on a menu without options or
+on any error (status, connection or payload), which is counted in the
+report without stopping the other sessions. Many sessions run concurrently
+over asyncio streams and the report holds the latency percentiles per
+callback path and the overall throughput::
+
+    report = asyncio.run(simulator.run('http://127.0.0.1:8000/',
+                                       sessions=5000, concurrency=500))
+    print(report.format())
+
+or ``python -m onem.simulator http://127.0.0.1:8000/ --sessions 5000``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import urllib.parse
+
+from onem.forms import FormItemType
+
+
+class SimulatorError(Exception):
+    pass
+
+
+class HTTPConnection(object):
+    """ Minimal keep-alive HTTP/1.1 client connection """
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._reader = self._writer = None
+
+    async def request(self, method, path, body=None):
+        """ Returns the ``(status, body bytes)`` of the response """
+        return await asyncio.wait_for(self._request(method, path, body),
+                                      self.timeout)
+
+    async def _request(self, method, path, body):
+        if self._writer is None:
+            await self._connect()
+
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}',
+                'Accept: application/json']
+        if body is not None:
+            head.append('Content-Type: application/json')
+            head.append(f'Content-Length: {len(body)}')
+        self._writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+                           + (body or b''))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise SimulatorError('Connection closed by the server')
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise SimulatorError(f'Malformed status line: {status_line!r}')
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = b''
+            while True:
+                line = await self._reader.readline()
+                try:
+                    size = int(line.split(b';')[0], 16)
+                except ValueError:
+                    raise SimulatorError(f'Malformed chunk size: {line!r}')
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                data += await self._reader.readexactly(size)
+                await self._reader.readline()
+        elif 'content-length' in headers:
+            data = await self._reader.readexactly(
+                int(headers['content-length']))
+        else:
+            data = await self._reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, data
+
+
+def answer(item, rng):
+    """
+    Returns a valid input for the form item dict ``item`` (as in
+    ``as_data()``) honoring its declared validation
+    """
+    if item.get('hidden'):
+        return item.get('value')
+
+    validation = item.get('validation') or {}
+    item_type = item['type']
+    if item_type == FormItemType.MENU:
+        values = [option['value'] for option in item['body']
+                  if option['type'] == 'option']
+        return rng.choice(values) if values else None
+    if item_type in (FormItemType.INT, FormItemType.FLOAT):
+        low = validation.get('min_value')
+        high = validation.get('max_value')
+        if low is None:
+            low = 0 if high is None else min(0, high)
+        high = low + 100 if high is None else max(low, high)
+        if item_type == FormItemType.INT:
+            low, high = math.ceil(low), math.floor(high)
+            return str(rng.randint(low, max(low, high)))
+        return str(min(max(round(rng.uniform(low, high), 2), low), high))
+    if item_type == FormItemType.DATE:
+        return '2020-01-31'
+    if item_type == FormItemType.DATETIME:
+        return '2020-01-31 12:30'
+
+    length = max(validation.get('min_length') or 0, 4)
+    if validation.get('max_length') is not None:
+        length = max(min(length, validation['max_length']), 0)
+    return ''.join(rng.choice('abcdefghij') for _ in range(length))
+
+
+def choose(menu, rng):
+    """ Returns a random option item dict with a path of ``menu`` or None """
+    options = [item for item in menu['body']
+               if item['type'] == 'option' and item.get('path')]
+    return rng.choice(options) if options else None
+
+
+def _percentile(ordered, percent):
+    """ Nearest-rank percentile of the sorted ``ordered`` values """
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class Report(object):
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.failures = {}
+        self.sessions = 0
+        self.elapsed = 0.0
+
+    def record(self, path, latency, error=None):
+        self.latencies.setdefault(path, []).append(latency)
+        if error is not None:
+            self.errors[path] = self.errors.get(path, 0) + 1
+
+    def fail(self, error):
+        """ Counts a session stopped by the unexpected ``error`` """
+        name = error.__class__.__name__
+        self.failures[name] = self.failures.get(name, 0) + 1
+
+    @property
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self):
+        """ Requests per second """
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        paths = {}
+        for path, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            stats = {'requests': len(values),
+                     'errors': self.errors.get(path, 0)}
+            for p in self.PERCENTILES:
+                stats[f'p{p}'] = _percentile(ordered, p)
+            stats['max'] = ordered[-1]
+            paths[path] = stats
+        return {'sessions': self.sessions, 'requests': self.requests,
+                'elapsed': self.elapsed, 'throughput': self.throughput,
+                'failures': dict(self.failures), 'paths': paths}
+
+    def format(self):
+        data = self.as_dict()
+        lines = [f'{data["sessions"]} sessions, {data["requests"]} requests '
+                 f'in {data["elapsed"]:.2f}s ({data["throughput"]:.1f} req/s)',
+                 '',
+                 f'{"path":<32} {"requests":>9} {"errors":>7} ' +
+                 ' '.join(f'{f"p{p} ms":>8}' for p in self.PERCENTILES) +
+                 f' {"max ms":>8}']
+        for path, stats in data['paths'].items():
+            lines.append(
+                f'{path:<32} {stats["requests"]:>9} {stats["errors"]:>7} ' +
+                ' '.join(f'{stats[f"p{p}"] * 1000:>8.1f}'
+                         for p in self.PERCENTILES) +
+                f' {stats["max"] * 1000:>8.1f}')
+        if data['failures']:
+            lines.append('')
+            lines.append('failed sessions: ' + ', '.join(
+                f'{name} {count}'
+                for name, count in sorted(data['failures'].items())))
+        return '\n'.join(lines)
+
+
+class Session(object):
+    def __init__(self, connection, report, rng, max_steps=20):
+        self.connection = connection
+        self.report = report
+        self.rng = rng
+        self.max_steps = max_steps
+
+    async def request(self, method, path, body=None):
+        """ Returns the decoded response payload or None on errors """
+        key = urllib.parse.urlsplit(path).path
+        start = time.perf_counter()
+        try:
+            status, data = await self.connection.request(method, path, body)
+        except Exception as e:
+            # the connection state is unknown after any error
+            self.report.record(key, time.perf_counter() - start, e)
+            await self.connection.close()
+            return None
+        latency = time.perf_counter() - start
+
+        if status >= 400:
+            self.report.record(key, latency, status)
+            return None
+        try:
+            payload = json.loads(data)
+        except ValueError as e:
+            self.report.record(key, latency, e)
+            return None
+        if not isinstance(payload, dict):
+            self.report.record(key, latency, 'payload')
+            return None
+        self.report.record(key, latency)
+        return payload
+
+    def _next_request(self, content):
+        if content['type'] == 'menu':
+            option = choose(content, self.rng)
+            if option is None:
+                return None
+            return option.get('method') or 'GET', option['path'], None
+
+        answers = {item['name']: answer(item, self.rng)
+                   for item in content['body']}
+        method = content.get('method') or 'POST'
+        path = content['path']
+        if method == 'GET':
+            query = urllib.parse.urlencode(
+                {k: json.dumps(v) if not isinstance(v, str) else v
+                 for k, v in answers.items()})
+            return method, f'{path}{"&" if "?" in path else "?"}{query}', None
+        return method, path, json.dumps(answers).encode('utf-8')
+
+    async def run(self, start_path):
+        next_request = ('GET', start_path, None)
+        for _ in range(self.max_steps):
+            payload = await self.request(*next_request)
+            if payload is None:
+                return
+            content = payload.get('content', payload)
+            next_request = self._next_request(content)
+            if next_request is None:
+                return
+
+
+async def run(url, sessions=100, concurrency=10, max_steps=20, seed=None,
+              timeout=30):
+    """
+    Runs ``sessions`` simulated sessions against the callback service at
+    ``url``, at most ``concurrency`` at the same time, and returns a Report
+
+    :param url: ``http://host:port/start/path`` of the first request
+    :param max_steps: maximum number of requests of a session
+    :param seed: seed of the random choices, for reproducible runs
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != 'http':
+        raise SimulatorError(f'Unsupported url scheme: {parts.scheme}')
+    start_path = parts.path or '/'
+    if parts.query:
+        start_path += f'?{parts.query}'
+
+    report = Report()
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    # connections are reused between the sessions of a worker slot
+    pool = [HTTPConnection(parts.hostname, parts.port or 80, timeout)
+            for _ in range(concurrency)]
+
+    async def run_session():
+        async with semaphore:
+            connection = pool.pop()
+            try:
+                session = Session(connection, report,
+                                  random.Random(rng.random()), max_steps)
+                try:
+                    await session.run(start_path)
+                except Exception as e:
+                    # i.e. a payload missing the fields of its type
+                    report.fail(e)
+                report.sessions += 1
+            finally:
+                pool.append(connection)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_session() for _ in range(sessions)))
+    finally:
+        report.elapsed = time.perf_counter() - start
+        for connection in pool:
+            await connection.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Load test a callback service with simulated sessions')
+    parser.add_argument('url', help='http://host:port/start/path')
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--max-steps', type=int, default=20)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.url, sessions=args.sessions,
+                             concurrency=args.concurrency,
+                             max_steps=args.max_steps, seed=args.seed))
+    print(json.dumps(report.as_dict(), indent=2) if args.json
+          else report.format())
+
+
+if __name__ == '__main__':
+    main()
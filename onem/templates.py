@@ -0,0 +1,88 @@
+"""
+Precompiled Response/Menu/Form templates.
+
+A template is declared once with named ``Placeholder`` strings in any of its
+text fields and compiled into a serialized skeleton. Rendering only escapes
+and splices the placeholder values, so its cost doesn't depend on the size of
+the menu or form::
+
+    template = Template(Response(Menu(
+        [MenuItem('Hello ' + Placeholder('name'), '/profile'), ...],
+        header='Balance: ' + Placeholder('balance'))))
+
+    template.render_json(name='Jane', balance='10 USD')
+
+Placeholder values are rendered as strings inside the JSON string they were
+placed in.
+"""
+import re
+from json.encoder import encode_basestring_ascii
+
+from onem import encoders
+
+
+MARK_START = '\x1e'
+MARK_END = '\x1f'
+
+_MARKER_RE = re.compile(
+    re.escape(encode_basestring_ascii(MARK_START)[1:-1]) +
+    r'([A-Za-z_][A-Za-z0-9_]*)' +
+    re.escape(encode_basestring_ascii(MARK_END)[1:-1])
+)
+
+
+class Placeholder(str):
+    """
+    A named placeholder usable wherever a string is expected, either as the
+    whole value or as part of it (``'Balance: ' + Placeholder('balance')``)
+    """
+    def __new__(cls, name):
+        if not name.isidentifier():
+            raise Exception(f'Invalid placeholder name: {name!r}')
+        obj = super(Placeholder, cls).__new__(
+            cls, f'{MARK_START}{name}{MARK_END}')
+        obj.name = name
+        return obj
+
+
+class Template(object):
+    def __init__(self, obj):
+        """
+        :param obj: Response, Menu or Form instance containing placeholders
+        """
+        skeleton = encoders.encode(obj)
+
+        self.parts = []
+        self.names = []
+
+        pos = 0
+        for match in _MARKER_RE.finditer(skeleton):
+            self.parts.append(skeleton[pos:match.start()])
+            self.names.append(match.group(1))
+            pos = match.end()
+        self.parts.append(skeleton[pos:])
+
+        # names of the placeholders used in this template
+        self.placeholders = frozenset(self.names)
+
+    def render_json(self, **values):
+        """
+        Returns the JSON string with every placeholder replaced by the
+        JSON-escaped ``str()`` of its value
+        """
+        try:
+            escaped = {name: encode_basestring_ascii(str(values[name]))[1:-1]
+                       for name in self.placeholders}
+        except KeyError as e:
+            raise Exception(f'Missing placeholder value: {e.args[0]}')
+
+        parts = self.parts
+        out = [parts[0]]
+        for i, name in enumerate(self.names, 1):
+            out.append(escaped[name])
+            out.append(parts[i])
+        return ''.join(out)
+
+    def render_json_bytes(self, **values):
+        """ Same as ``render_json`` but returns UTF-8 encoded bytes """
+        return self.render_json(**values).encode('utf-8')
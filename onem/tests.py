@@ -1,6 +1,23 @@
+import asyncio
+import concurrent.futures
+import gzip
+import io
+import itertools
+import json
+import pickle
+import random
+import threading
 import unittest
+import zlib
 
-from onem.menus import MenuItem, Menu, MenuMeta
+from onem import (Response, aio, backends, batch, cbor, compact,
+                  compression, digests, encoders, flyweight, frozen,
+                  instrumentation, rendering, schema, simulator)
+from onem.cache import ResponseCache
+from onem.search import SearchIndex
+from onem.templates import Placeholder, Template
+from onem.validation import FormValidator, ValidationError
+from onem.menus import MenuItem, Menu, MenuMeta, PaginatedMenu
 from onem import forms
 
 
@@ -405,5 +422,1412 @@ class TestForm(unittest.TestCase):
         self.assertEqual(form.as_data(), expected)
 
 
+class TestResponse(unittest.TestCase):
+    def test_menu_response(self):
+        menu = Menu([MenuItem('First menu item', '/callback-1')])
+        response = Response(menu)
+
+        self.assertEqual(response.content_type, 'menu')
+        self.assertEqual(response.as_data(), {'content_type': 'menu',
+                                              'content': menu.as_data()})
+        self.assertEqual(json.loads(response.as_json()), response.as_data())
+
+    def test_form_response(self):
+        form = forms.Form([forms.DateFormItem('date')], '/callback')
+        response = Response(form)
+
+        self.assertEqual(response.content_type, 'form')
+        self.assertEqual(response.as_data(), {'content_type': 'form',
+                                              'content': form.as_data()})
+
+
+def build_form():
+    return forms.Form([
+        forms.StringFormItem('name', label='Name \u00e9', min_length=2,
+                             max_length_error='Too long'),
+        forms.HiddenFormItem('hidden', {'nested': [1, 2.5]}),
+        forms.IntFormItem('age', min_value=12, url='/age', method='post'),
+        forms.FloatFormItem('ranking', max_value=9.9, required=False),
+        forms.DateFormItem('date', header='When?'),
+        forms.DateTimeFormItem('datetime', editable=False),
+        forms.MenuFormItem('poll', [
+            forms.MenuItemFormItem('Yes', True),
+            forms.MenuItemFormItem('Content "quoted"', is_option=False),
+            forms.MenuItemFormItem('No', 0, text_search='no nope'),
+        ], meta=forms.MenuFormItemMeta(numbered=True)),
+    ], '/callback', method='PUT', header='header', footer='footer',
+        meta=forms.FormMeta(confirm=False))
+
+
+def build_menu():
+    return Menu([
+        MenuItem('First \u2713', '/callback-1', text_search='first'),
+        MenuItem('Second', '/callback-2', method='post'),
+        MenuItem('Content', is_option=False),
+    ], header='header', footer=None, meta=MenuMeta(auto_select=False))
+
+
+class TestPaginatedMenu(unittest.TestCase):
+    def factory(self, row):
+        return MenuItem(f'Row {row}', f'/rows/{row}')
+
+    def labels(self, menu):
+        return [item.label for item in menu.body]
+
+    def test_first_page(self):
+        menu = PaginatedMenu(range(25), '/rows', page_size=10,
+                             item_factory=self.factory, header='Rows')
+
+        self.assertTrue(menu.has_next)
+        self.assertEqual(menu.header, 'Rows')
+        self.assertEqual(self.labels(menu),
+                         [f'Row {i}' for i in range(10)] + ['Next'])
+        self.assertEqual(menu.body[-1].url, '/rows?page=2')
+
+    def test_sources(self):
+        rows = [self.factory(i) for i in range(25)]
+        sources = (rows, iter(rows), lambda offset, limit:
+                   rows[offset:offset + limit])
+
+        for source in sources:
+            menu = PaginatedMenu(source, '/rows?sort=asc', page=3,
+                                 page_size=10)
+            self.assertFalse(menu.has_next)
+            self.assertEqual(self.labels(menu),
+                             [f'Row {i}' for i in range(20, 25)] +
+                             ['Previous'])
+            self.assertEqual(menu.body[-1].url, '/rows?sort=asc&page=2')
+
+    def test_fetches_page_only(self):
+        built = []
+
+        def factory(row):
+            built.append(row)
+            return self.factory(row)
+
+        menu = PaginatedMenu(itertools.count(), '/rows', page=2, page_size=5,
+                             item_factory=factory)
+
+        self.assertEqual(built, [5, 6, 7, 8, 9])
+        self.assertEqual(self.labels(menu)[-2:], ['Next', 'Previous'])
+        self.assertEqual(len(menu.as_data()['body']), 7)
+
+    def test_invalid_rows(self):
+        with self.assertRaises(AssertionError):
+            PaginatedMenu(['not a menu item'], '/rows')
+
+    def test_page_url(self):
+        menu = PaginatedMenu([], '/rows?page=3&sort=asc', page=3)
+        self.assertEqual(menu.page_url(4), '/rows?sort=asc&page=4')
+        self.assertEqual(self.labels(menu), ['Previous'])
+        self.assertEqual(menu.body[0].url, '/rows?sort=asc&page=2')
+
+    def test_from_data(self):
+        menu = PaginatedMenu(range(25), '/rows', page=2, page_size=10,
+                             item_factory=self.factory, header='Rows')
+        for trusted in (False, True):
+            clone = PaginatedMenu.from_data(menu.as_data(), trusted=trusted)
+            self.assertIs(clone.__class__, Menu)
+            self.assertEqual(clone.as_data(), menu.as_data())
+
+
+class FakeArray(object):
+    """ Quacks like a NumPy array for column conversions """
+    def __init__(self, values):
+        self.values = values
+
+    def tolist(self):
+        return list(self.values)
+
+
+class TestColumns(unittest.TestCase):
+    def test_menu_from_columns(self):
+        menu = Menu.from_columns(
+            FakeArray(['First', 'Second', 'Content']),
+            urls=['/first', '/second', '/ignored'],
+            methods=['get', 'POST', None],
+            is_option=[True, True, False],
+            text_search=['first', None, 'ignored'],
+            header='header', meta=MenuMeta())
+        expected = Menu([
+            MenuItem('First', '/first', method='get', text_search='first'),
+            MenuItem('Second', '/second', method='POST'),
+            MenuItem('Content', is_option=False),
+        ], header='header', meta=MenuMeta())
+
+        self.assertEqual(menu.as_data(), expected.as_data())
+        self.assertEqual(encoders.encode(menu), encoders.encode(expected))
+        self.assertEqual(b''.join(menu.iter_json(chunk_size=16)),
+                         encoders.encode(expected).encode())
+        self.assertEqual([item.as_data() for item in menu.body],
+                         [item.as_data() for item in expected.body])
+        self.assertEqual(menu.body[-1].as_data(), expected.body[-1].as_data())
+        self.assertEqual(len(menu.body[:2]), 2)
+
+    def test_menu_defaults(self):
+        menu = Menu.from_columns(['First', 'Second'])
+        expected = Menu([MenuItem('First'), MenuItem('Second')])
+        self.assertEqual(encoders.encode(menu), encoders.encode(expected))
+
+    def test_invalid_columns(self):
+        with self.assertRaises(Exception):
+            Menu.from_columns(['First'], urls=['no-slash'])
+        with self.assertRaises(Exception):
+            Menu.from_columns(['First'], methods=['FETCH'])
+        with self.assertRaises(Exception):
+            Menu.from_columns(['First', 'Second'], urls=['/first'])
+
+    def test_content_columns_not_validated(self):
+        menu = Menu.from_columns(['x', 'y'], urls=['nope', '/y'],
+                                 methods=['FETCH', None],
+                                 is_option=[False, True])
+        expected = Menu([MenuItem('x', 'nope', method='FETCH',
+                                  is_option=False),
+                         MenuItem('y', '/y')])
+        self.assertEqual(encoders.encode(menu), encoders.encode(expected))
+
+    def test_menu_form_item_from_columns(self):
+        item = forms.MenuFormItem.from_columns(
+            'poll', ['Yes', 'Content', 'No'], [True, None, 0],
+            is_option=[True, False, True], text_search=['yes', 'x', None],
+            label='Choose', meta=forms.MenuFormItemMeta(numbered=True))
+        expected = forms.MenuFormItem('poll', [
+            forms.MenuItemFormItem('Yes', True, text_search='yes'),
+            forms.MenuItemFormItem('Content', is_option=False),
+            forms.MenuItemFormItem('No', 0),
+        ], label='Choose', meta=forms.MenuFormItemMeta(numbered=True))
+
+        self.assertEqual(item.as_data(), expected.as_data())
+        self.assertEqual(encoders.encode(item), encoders.encode(expected))
+
+        with self.assertRaises(AssertionError):
+            forms.MenuFormItem.from_columns('poll', ['Yes'], [None])
+
+    def test_frozen_columns(self):
+        menu = Menu.from_columns(['First', 'Second'],
+                                 urls=['/first', '/second']).freeze()
+        payload = menu.as_json()
+        with self.assertRaises(frozen.FrozenError):
+            menu.body.labels = ('z', 'z')
+        with self.assertRaises(frozen.FrozenError):
+            del menu.body.urls
+        self.assertEqual(menu.as_json(), payload)
+
+        clone = pickle.loads(pickle.dumps(menu))
+        self.assertEqual(encoders.encode(clone), encoders.encode(menu))
+        with self.assertRaises(frozen.FrozenError):
+            clone.body.labels = ('z', 'z')
+
+
+class TestDecoders(unittest.TestCase):
+    def assertRoundTrip(self, obj):
+        data = obj.as_data()
+        for trusted in (False, True):
+            clone = obj.__class__.from_data(data, trusted=trusted)
+            self.assertIs(clone.__class__, obj.__class__)
+            self.assertEqual(clone.as_data(), data)
+            self.assertEqual(encoders.encode(clone), encoders.encode(obj))
+
+            clone = obj.__class__.from_json(obj.as_json_bytes(),
+                                            trusted=trusted)
+            self.assertEqual(clone.as_data(), data)
+
+    def test_round_trip(self):
+        form = build_form()
+        menu = build_menu()
+
+        for obj in (Response(form), Response(menu), form, menu):
+            self.assertRoundTrip(obj)
+        for item in form.items + menu.body + form.items[-1].body:
+            self.assertRoundTrip(item)
+
+    def test_form_item_dispatch(self):
+        for item in build_form().items:
+            clone = forms.BaseFormItem.from_data(item.as_data())
+            self.assertIs(clone.__class__, item.__class__)
+
+    def test_validation(self):
+        data = Response(build_menu()).as_data()
+        data['content']['body'][0]['path'] = 'no-slash'
+
+        with self.assertRaises(Exception):
+            Response.from_data(data)
+        with self.assertRaises(Exception):
+            Response.from_data({'content_type': 'unknown', 'content': {}})
+        with self.assertRaises(Exception):
+            forms.BaseFormItem.from_data({'name': 'x', 'type': 'unknown'})
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.validator = FormValidator(forms.Form([
+            forms.StringFormItem('name', min_length=2, max_length=5,
+                                 min_length_error='Too short',
+                                 validate_url='/validate-name'),
+            forms.HiddenFormItem('hidden', 'secret'),
+            forms.IntFormItem('age', min_value=12, max_value=99,
+                              min_value_error='Too young',
+                              validate_type_error='Send a number'),
+            forms.FloatFormItem('ranking', max_value=9.9, required=False),
+            forms.DateFormItem('date'),
+            forms.DateTimeFormItem('datetime'),
+            forms.MenuFormItem('poll', [
+                forms.MenuItemFormItem('Yes', True),
+                forms.MenuItemFormItem('Content', is_option=False),
+                forms.MenuItemFormItem('Two', 2),
+            ], meta=forms.MenuFormItemMeta(multi_select=True)),
+        ], '/callback'))
+
+    def assertValid(self, name, user_input):
+        self.assertEqual(self.validator.validate(name, user_input),
+                         {'valid': True, 'error': None})
+
+    def assertInvalid(self, name, user_input, error):
+        self.assertEqual(self.validator.validate(name, user_input),
+                         {'valid': False, 'error': error})
+
+    def test_validate(self):
+        self.assertValid('name', 'Jane')
+        self.assertInvalid('name', 'J', 'Too short')
+        self.assertInvalid('name', 'Johnathan', 'Value is too long.')
+        self.assertInvalid('name', '', 'This value is required.')
+
+        self.assertValid('age', ' 42 ')
+        self.assertInvalid('age', '11', 'Too young')
+        self.assertInvalid('age', '100', 'Value is too big.')
+        self.assertInvalid('age', 'old', 'Send a number')
+        self.assertInvalid('age', '', 'This value is required.')
+
+        self.assertValid('ranking', '9.5')
+        self.assertValid('ranking', '')
+        self.assertInvalid('ranking', '10', 'Value is too big.')
+        for user_input in ('nan', 'inf', '-Infinity', '1_0'):
+            self.assertInvalid('ranking', user_input, 'Invalid value.')
+        self.assertInvalid('age', '1_2', 'Send a number')
+
+        self.assertValid('date', '2020-02-29')
+        self.assertValid('date', '29/02/2020')
+        self.assertInvalid('date', '2021-02-29', 'Invalid value.')
+        self.assertValid('datetime', '2020-02-29 10:30')
+
+        self.assertValid('poll', 'True')
+        self.assertValid('poll', 'True, 2')
+        self.assertInvalid('poll', 'None', 'Invalid value.')
+
+        self.assertEqual(self.validator.callbacks, ['name'])
+
+    def test_unknown_item(self):
+        with self.assertRaisesRegex(Exception, 'Unknown form item: nope'):
+            self.validator.validate('nope', 'x')
+        with self.assertRaisesRegex(Exception, 'Unknown form item: nope'):
+            self.validator.validate_many({'name': 'Jane', 'nope': 'x'})
+
+    def test_clean(self):
+        values = self.validator.clean({
+            'name': 'Jane', 'age': '42', 'date': '2020-02-29',
+            'datetime': '2020-02-29T10:30', 'poll': '2'})
+        self.assertEqual(values['age'], 42)
+        self.assertIsNone(values['ranking'])
+        self.assertEqual(values['hidden'], 'secret')
+        self.assertEqual(values['poll'], [2])
+
+        with self.assertRaises(ValidationError) as ctx:
+            self.validator.clean({'age': '11'})
+        self.assertEqual(ctx.exception.errors['age'], 'Too young')
+        self.assertIn('name', ctx.exception.errors)
+        self.assertNotIn('ranking', ctx.exception.errors)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled(self):
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertFalse(hasattr(Menu.as_data, '__wrapped__'))
+        self.assertFalse(hasattr(forms.BaseFormItem.__init__, '__wrapped__'))
+
+    def test_profile(self):
+        with instrumentation.profile() as stats:
+            self.assertTrue(instrumentation.is_enabled())
+            response = Response(build_menu())
+            payload = response.as_json_bytes()
+            forms.StringFormItem('name').as_data()
+
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertFalse(hasattr(Menu.as_data, '__wrapped__'))
+
+        counters = stats.as_dict()
+        self.assertEqual(counters['MenuItem']['construct'], 3)
+        self.assertEqual(counters['Menu']['construct'], 1)
+        self.assertEqual(counters['Menu']['items'], 3)
+        self.assertEqual(counters['Response']['as_json_calls'], 1)
+        self.assertEqual(counters['Response']['bytes'], len(payload))
+        self.assertGreater(counters['Response']['as_json_time'], 0)
+        # super() calls are only counted once
+        self.assertEqual(counters['StringFormItem']['construct'], 1)
+        self.assertEqual(counters['StringFormItem']['as_data_calls'], 1)
+        self.assertNotIn('BaseFormItem', counters)
+
+    def test_profile_context(self):
+        class LocalMenu(Menu):
+            pass
+
+        menu = build_menu().freeze()
+        started = threading.Event()
+        stop = threading.Event()
+
+        def other_thread():
+            while not stop.is_set():
+                MenuItem('other', '/other').as_data()
+                started.set()
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        try:
+            with instrumentation.profile() as stats:
+                started.wait()
+                payload = menu.as_json()
+                MenuItem('mine', '/mine')
+                # frozen subclass created while profiling
+                LocalMenu([]).freeze().as_json()
+        finally:
+            stop.set()
+            thread.join()
+
+        counters = stats.as_dict()
+        self.assertEqual(counters['MenuItem'],
+                         dict(counters['MenuItem'], construct=1,
+                              as_data_calls=0))
+        self.assertEqual(counters['FrozenMenu']['as_json_calls'], 1)
+        self.assertEqual(counters['FrozenMenu']['bytes'], len(payload))
+        self.assertEqual(counters['FrozenLocalMenu']['as_json_calls'], 1)
+        self.assertEqual(instrumentation.STATS.as_dict(), {})
+        self.assertFalse(hasattr(frozen.frozen_class(Menu).as_json,
+                                 '__wrapped__'))
+
+    def test_hooks(self):
+        events = []
+        instrumentation.add_hook(lambda *event: events.append(event))
+        instrumentation.enable()
+        try:
+            Menu([MenuItem('item', '/item')]).as_data()
+        finally:
+            instrumentation.disable()
+            instrumentation._hooks.clear()
+            instrumentation.STATS.reset()
+
+        names = [(event, name) for event, name, value in events]
+        self.assertIn(('construct', 'MenuItem'), names)
+        self.assertIn(('items', 'Menu'), names)
+        self.assertIn(('as_data', 'Menu'), names)
+        self.assertIn(('as_data', 'MenuItem'), names)
+
+
+class TestSchema(unittest.TestCase):
+    def assertSchemaError(self, payload, location):
+        with self.assertRaises(schema.SchemaError) as ctx:
+            schema.validate(payload)
+        self.assertEqual(ctx.exception.location, location)
+
+    def test_valid(self):
+        for obj in (build_menu(), build_form()):
+            schema.validate(obj.as_data())
+            schema.validate(Response(obj).as_data())
+
+    def test_menu_errors(self):
+        data = Response(build_menu()).as_data()
+        data['content']['body'][1]['path'] = 'no-slash'
+        self.assertSchemaError(data, 'content.body[1].path')
+
+        data = build_menu().as_data()
+        del data['body'][2]['type']
+        self.assertSchemaError(data, 'body[2].type')
+
+        data = build_menu().as_data()
+        data['meta']['auto_select'] = 'yes'
+        self.assertSchemaError(data, 'meta.auto_select')
+
+        data = Response(build_menu()).as_data()
+        data['content_type'] = 'form'
+        self.assertSchemaError(data, 'content.type')
+
+    def test_form_errors(self):
+        data = Response(build_form()).as_data()
+        data['content']['body'][0]['validation']['min_length'] = '2'
+        self.assertSchemaError(data, 'content.body[0].validation.min_length')
+
+        data = build_form().as_data()
+        data['body'][6]['body'][1]['type'] = 'separator'
+        self.assertSchemaError(data, 'body[6].body[1].type')
+
+        data = build_form().as_data()
+        data['body'][3]['type'] = 'decimal'
+        self.assertSchemaError(data, 'body[3].type')
+
+        data = build_form().as_data()
+        data['method'] = 'FETCH'
+        self.assertSchemaError(data, 'method')
+
+        data = build_form().as_data()
+        data['body'] = None
+        self.assertSchemaError(data, 'body')
+
+    def test_error_message(self):
+        data = build_form().as_data()
+        data['body'][2]['required'] = None
+        with self.assertRaises(schema.SchemaError) as ctx:
+            schema.validate(data)
+        self.assertEqual(str(ctx.exception),
+                         'body[2].required: must be a boolean')
+
+
+class TestEncoders(unittest.TestCase):
+    def assertEncoded(self, obj):
+        self.assertEqual(encoders.encode(obj), json.dumps(obj.as_data()))
+
+    def test_menu(self):
+        menu = build_menu()
+        self.assertEncoded(menu)
+        self.assertEncoded(Response(menu))
+        self.assertEncoded(Menu([]))
+
+    def test_form(self):
+        form = build_form()
+        for item in form.items:
+            self.assertEncoded(item)
+        self.assertEncoded(form)
+        self.assertEncoded(Response(form))
+
+    def test_overridden_as_data(self):
+        class CustomItem(MenuItem):
+            def as_data(self):
+                data = super(CustomItem, self).as_data()
+                data['custom'] = 1
+                return data
+
+        class PlainItem(MenuItem):
+            pass
+
+        menu = Menu([CustomItem('custom', '/c'), PlainItem('plain', '/p')])
+        self.assertEncoded(menu)
+        self.assertIsNot(encoders.encoder_for(PlainItem),
+                         encoders.encoder_for(CustomItem))
+
+
+class TestStreaming(unittest.TestCase):
+    def test_iter_json(self):
+        for obj in (build_menu(), build_form(),
+                    Response(build_menu()), Response(build_form())):
+            expected = encoders.encode(obj).encode('utf-8')
+            self.assertEqual(b''.join(obj.iter_json()), expected)
+
+            chunks = list(obj.iter_json(chunk_size=64))
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), expected)
+
+    def test_write_json(self):
+        response = Response(build_menu())
+        fp = io.BytesIO()
+        response.write_json(fp, chunk_size=16)
+        self.assertEqual(fp.getvalue(), encoders.encode(response).encode())
+
+
+class TestBackends(unittest.TestCase):
+    def objects(self):
+        form = build_form()
+        menu = build_menu()
+        yield from form.items
+        yield from form.items[-1].body
+        yield from menu.body
+        yield from (form, menu, Response(form), Response(menu))
+        # values only the stdlib encodes as is
+        yield forms.HiddenFormItem('keys', {1: 'a', 'b': 2})
+        yield Response(forms.Form([forms.HiddenFormItem('big', 10 ** 20)],
+                                  '/callback'))
+
+    def test_backends(self):
+        names = backends.available_backends()
+        self.assertIn('json', names)
+
+        for name in names:
+            for obj in self.objects():
+                data = json.loads(json.dumps(obj.as_data()))
+                self.assertEqual(json.loads(obj.as_json(backend=name)), data)
+                self.assertEqual(json.loads(obj.as_json_bytes(backend=name)),
+                                 data)
+
+    def test_default_backend(self):
+        self.assertEqual(backends.get_backend().name, 'json')
+        for obj in itertools.chain(self.objects(), [
+                forms.HiddenFormItem('nan', float('nan'))]):
+            self.assertEqual(obj.as_json(), json.dumps(obj.as_data()))
+            self.assertEqual(obj.as_json_bytes(),
+                             json.dumps(obj.as_data()).encode())
+            self.assertEqual(obj.as_json(backend='plain'),
+                             json.dumps(obj.as_data()))
+
+    def test_auto_backend(self):
+        self.assertEqual(backends.get_backend('auto').name,
+                         backends.available_backends()[0])
+
+    def test_set_backend(self):
+        menu = build_menu()
+        try:
+            backends.set_backend('auto')
+            self.assertEqual(json.loads(menu.as_json()), menu.as_data())
+            self.assertIsInstance(menu.as_json_bytes(), bytes)
+        finally:
+            backends.set_backend('json')
+
+        with self.assertRaises(Exception):
+            backends.set_backend('invalid')
+
+
+class TestFrozen(unittest.TestCase):
+    def test_freeze_menu(self):
+        menu = build_menu()
+        frozen_menu = menu.freeze()
+
+        self.assertIsInstance(frozen_menu, Menu)
+        self.assertTrue(frozen.is_frozen(frozen_menu))
+        self.assertFalse(frozen.is_frozen(menu))
+        self.assertIs(frozen_menu.freeze(), frozen_menu)
+        self.assertIsInstance(frozen_menu.body, tuple)
+        self.assertTrue(all(frozen.is_frozen(i) for i in frozen_menu.body))
+        self.assertTrue(frozen.is_frozen(frozen_menu.meta))
+
+        self.assertEqual(frozen_menu.as_data(), menu.as_data())
+        self.assertEqual(frozen_menu.as_json(), json.dumps(menu.as_data()))
+        self.assertEqual(frozen_menu._json, frozen_menu.as_json())
+
+        menu.header = 'still mutable'
+
+    def test_mutation_raises(self):
+        form = build_form().freeze()
+
+        with self.assertRaises(frozen.FrozenError):
+            form.header = 'changed'
+        with self.assertRaises(frozen.FrozenError):
+            form.items[0].label = 'changed'
+        with self.assertRaises(frozen.FrozenError):
+            del form.items[-1].meta
+        with self.assertRaises(AttributeError):
+            form.items.append(forms.DateFormItem('date'))
+
+    def test_splice_frozen_children(self):
+        back = MenuItem('Back', '/back').freeze()
+        menu = Menu([MenuItem('First', '/first'), back])
+
+        self.assertEqual(encoders.encode(menu), json.dumps(menu.as_data()))
+        self.assertEqual(back._json, json.dumps(back.as_data()))
+        self.assertEqual(menu.as_json(), json.dumps(menu.as_data()))
+        self.assertEqual(b''.join(Response(menu).iter_json()),
+                         json.dumps(Response(menu).as_data()).encode())
+
+        # the cached fragment is used as is, whatever the backend
+        form = build_form()
+        form.items[-1] = form.items[-1].freeze()
+        object.__setattr__(form.items[-1], '_json', '{"spliced": true}')
+        self.assertTrue(encoders.contains_frozen(Response(form)))
+        self.assertFalse(encoders.contains_frozen(build_form()))
+        for name in backends.available_backends():
+            for output in (Response(form).as_json(backend=name),
+                           Response(form).as_json_bytes(backend=name)):
+                self.assertEqual(json.loads(output)['content']['body'][-1],
+                                 {'spliced': True})
+
+    def test_explicit_backend(self):
+        item = forms.HiddenFormItem('h', ['\u00e9', 1]).freeze()
+        data = json.loads(json.dumps(item.as_data()))
+        object.__setattr__(item, '_json', '{"spliced": true}')
+        self.assertEqual(item.as_json(), '{"spliced": true}')
+        self.assertEqual(item.as_json(backend='json'), '{"spliced": true}')
+        self.assertEqual(item.as_json(backend='plain'),
+                         json.dumps(item.as_data()))
+
+        for name in backends.available_backends():
+            if name == 'json':
+                continue
+            backend = backends.get_backend(name)
+            self.assertEqual(item.as_json(backend=name),
+                             backend.dumps(data))
+            self.assertEqual(item.as_json_bytes(backend=name),
+                             backend.dumps_bytes(data))
+
+    def test_deep_freeze(self):
+        with self.assertRaises(AttributeError):
+            Menu([]).freeze().body.append(MenuItem('a', '/a'))
+
+        hidden = forms.HiddenFormItem('h', [1, {'a': [2]}]).freeze()
+        payload = hidden.as_json()
+        with self.assertRaises(AttributeError):
+            hidden.value.append(3)
+        with self.assertRaises(frozen.FrozenError):
+            hidden.value[1]['b'] = 3
+        with self.assertRaises(AttributeError):
+            hidden.value[1]['a'].append(3)
+        self.assertEqual(hidden.as_json(), json.dumps(hidden.as_data()))
+        self.assertEqual(hidden.as_json(), payload)
+        for name in backends.available_backends():
+            self.assertEqual(json.loads(hidden.as_json_bytes(backend=name)),
+                             json.loads(payload))
+        self.assertEqual(pickle.loads(pickle.dumps(hidden)).value,
+                         hidden.value)
+
+    def test_pickle(self):
+        form = build_form().freeze()
+        form.as_json()
+        clone = pickle.loads(pickle.dumps(form))
+
+        self.assertTrue(frozen.is_frozen(clone))
+        self.assertEqual(clone.as_data(), form.as_data())
+
+
+class TestTemplates(unittest.TestCase):
+    def build(self, name, balance, user_id):
+        return Response(Menu([
+            MenuItem('Hello ' + name, '/users/' + user_id),
+            MenuItem('Static content', is_option=False),
+        ], header=f'Balance: {balance}', footer='Reply A-B'))
+
+    def test_render_json(self):
+        template = Template(self.build(Placeholder('name'),
+                                       Placeholder('balance'),
+                                       Placeholder('user_id')))
+        self.assertEqual(template.placeholders,
+                         {'name', 'balance', 'user_id'})
+
+        values = {'name': 'Ren\u00e9 "the" \\ user', 'balance': 10.5,
+                  'user_id': '42'}
+        expected = self.build(values['name'], values['balance'],
+                              values['user_id'])
+
+        rendered = template.render_json(**values)
+        self.assertEqual(rendered, encoders.encode(expected))
+        self.assertEqual(json.loads(template.render_json_bytes(**values)),
+                         expected.as_data())
+
+    def test_missing_value(self):
+        template = Template(Menu([], header=Placeholder('header')))
+        with self.assertRaises(Exception):
+            template.render_json()
+
+    def test_invalid_name(self):
+        with self.assertRaises(Exception):
+            Placeholder('not valid')
+
+
+class TestSearch(unittest.TestCase):
+    def build_menu(self):
+        return Menu([
+            MenuItem('Products', is_option=False),
+            MenuItem('Chocolate bar', '/p/1'),
+            MenuItem('Cr\u00e8me br\u00fbl\u00e9e', '/p/2'),
+            MenuItem('Bar of soap', '/p/3', text_search='soap bar hygiene'),
+            MenuItem('Milk chocolate', '/p/4'),
+        ], header='Products', meta=MenuMeta(auto_select=False))
+
+    def labels(self, items):
+        return [item.label for item in items]
+
+    def test_search(self):
+        index = SearchIndex(self.build_menu())
+
+        self.assertEqual(self.labels(index.search('choc')),
+                         ['Chocolate bar', 'Milk chocolate'])
+        self.assertEqual(self.labels(index.search('BAR choc')),
+                         ['Chocolate bar'])
+        self.assertEqual(self.labels(index.search('creme brulee')),
+                         ['Cr\u00e8me br\u00fbl\u00e9e'])
+        self.assertEqual(self.labels(index.search('hygiene')),
+                         ['Bar of soap'])
+        self.assertEqual(self.labels(index.search('colat')),
+                         ['Chocolate bar', 'Milk chocolate'])
+        self.assertEqual(index.search('products'), [])
+        self.assertEqual(index.search(''), [])
+
+    def test_narrow(self):
+        menu = self.build_menu()
+        narrowed = SearchIndex(menu).narrow('chocolate')
+
+        self.assertIsInstance(narrowed, Menu)
+        self.assertEqual(narrowed.header, 'Products')
+        self.assertIs(narrowed.meta, menu.meta)
+        self.assertEqual(self.labels(narrowed.body),
+                         ['Chocolate bar', 'Milk chocolate'])
+        self.assertEqual(len(menu.body), 5)
+
+        narrowed = SearchIndex(menu.freeze()).narrow('soap')
+        self.assertTrue(frozen.is_frozen(narrowed))
+        self.assertEqual(self.labels(narrowed.body), ['Bar of soap'])
+
+    def test_narrow_menu_form_item(self):
+        item = build_form().items[-1]
+        narrowed = SearchIndex(item).narrow('nope')
+
+        self.assertEqual(narrowed.name, 'poll')
+        self.assertEqual(self.labels(narrowed.body), ['No'])
+
+
+class TestSlots(unittest.TestCase):
+    def test_no_instance_dict(self):
+        objects = [MenuItem('label', '/path'), MenuMeta(),
+                   forms.MenuFormItemMeta(), forms.FormMeta()]
+        objects.extend(build_form().items)
+        objects.extend(build_form().items[-1].body)
+
+        for obj in objects:
+            self.assertFalse(hasattr(obj, '__dict__'), obj.__class__)
+
+
+class TestDigests(unittest.TestCase):
+    def test_equal_payloads(self):
+        menu = build_menu()
+        form = build_form()
+
+        self.assertEqual(len(menu.digest()), digests.DIGEST_SIZE)
+        self.assertEqual(menu.digest(), build_menu().digest())
+        self.assertEqual(menu.digest(), menu.freeze().digest())
+        self.assertEqual(form.digest(), form.freeze().digest())
+        self.assertEqual(Response(form).etag(),
+                         Response(form.freeze()).etag())
+        self.assertEqual(
+            Response.from_json(Response(form).as_json()).digest(),
+            Response(form).digest())
+
+        columns = Menu.from_columns(['A', 'B'], urls=['/a', '/b'])
+        self.assertEqual(columns.digest(),
+                         Menu([MenuItem('A', '/a'),
+                               MenuItem('B', '/b')]).digest())
+
+    def test_changes(self):
+        menu = build_menu()
+        before = menu.digest()
+
+        menu.body[0].label = 'changed'
+        self.assertNotEqual(menu.digest(), before)
+        self.assertNotEqual(Menu(menu.body[:1]).digest(),
+                            Menu(menu.body[1:]).digest())
+        self.assertNotEqual(Response(menu).digest(), menu.digest())
+
+    def test_frozen_cache(self):
+        back = MenuItem('Back', '/back').freeze()
+        menu = Menu([MenuItem('First', '/first'), back])
+        menu.digest()
+
+        self.assertEqual(back._digest, back.digest())
+        self.assertEqual(pickle.loads(pickle.dumps(back)).digest(),
+                         back.digest())
+
+    def test_if_none_match(self):
+        tag = Response(build_menu()).etag()
+
+        self.assertEqual(tag, f'"{Response(build_menu()).digest().hex()}"')
+        self.assertTrue(digests.if_none_match(tag, tag))
+        self.assertTrue(digests.if_none_match(f'"x", W/{tag}', tag))
+        self.assertTrue(digests.if_none_match('*', tag))
+        self.assertFalse(digests.if_none_match('"x"', tag))
+        self.assertFalse(digests.if_none_match(None, tag))
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = ResponseCache(max_size=2, ttl=10,
+                                   clock=lambda: self.now)
+
+    def test_lru_and_ttl(self):
+        cache = self.cache
+        response = Response(build_menu())
+
+        self.assertEqual(cache.set('a', response), response.as_json_bytes())
+        cache.set('b', b'b')
+        self.assertEqual(cache.get('a'), response.as_json_bytes())
+        cache.set('c', b'c')  # evicts 'b', the least recently used
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), b'c')
+
+        self.now += 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats.as_dict(), {
+            'hits': 2, 'misses': 2, 'sets': 3, 'evictions': 1,
+            'expirations': 1, 'invalidations': 0})
+
+    def test_invalidation(self):
+        cache = self.cache
+        cache.set('a', b'a', tags=['user:1'])
+        cache.set('b', b'b', tags=['user:1', 'user:2'])
+
+        self.assertEqual(cache.invalidate_tag('user:1'), 2)
+        self.assertEqual(len(cache), 0)
+        cache.set('a', b'a', tags=['user:1'])
+        self.assertTrue(cache.invalidate('a'))
+        self.assertFalse(cache.invalidate('a'))
+        self.assertEqual(cache.invalidate_tag('user:2'), 0)
+
+    def test_decorator(self):
+        calls = []
+
+        @self.cache.cached(tags=lambda name: [name])
+        def handler(name):
+            calls.append(name)
+            return Response(Menu([MenuItem(name, '/name')]))
+
+        @self.cache.cached()
+        async def async_handler(name):
+            calls.append(name)
+            return Response(Menu([MenuItem(name, '/name')]))
+
+        self.assertEqual(handler('x'), handler('x'))
+        self.assertEqual(calls, ['x'])
+        self.assertEqual(self.cache.invalidate_tag('x'), 1)
+        handler('x')
+        self.assertTrue(handler.invalidate('x'))
+
+        payload = asyncio.run(async_handler('y'))
+        self.assertEqual(asyncio.run(async_handler('y')), payload)
+        self.assertEqual(calls, ['x', 'x', 'y'])
+        self.assertEqual(json.loads(payload)['content']['body'][0]
+                         ['description'], 'y')
+
+
+class TestAsync(unittest.TestCase):
+    def tearDown(self):
+        aio.reset()
+
+    def collect(self, obj, chunk_size=64):
+        async def run():
+            return [chunk async for chunk in obj.aiter_json(chunk_size)]
+        return asyncio.run(run())
+
+    def test_inline_and_offloaded(self):
+        response = Response(build_form())
+        expected = encoders.encode(response).encode()
+        self.assertEqual(aio.size(response), 10)
+
+        for threshold in (1000, 1):
+            aio.configure(threshold=threshold)
+            self.assertEqual(asyncio.run(response.as_json_async()),
+                             response.as_json())
+            self.assertEqual(asyncio.run(response.as_json_bytes_async()),
+                             response.as_json_bytes())
+            chunks = self.collect(response)
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), expected)
+
+    def test_process_pool(self):
+        menu = build_menu()
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            aio.configure(threshold=1, executor=executor)
+            try:
+                self.assertEqual(asyncio.run(menu.as_json_async()),
+                                 menu.as_json())
+                self.assertEqual(b''.join(self.collect(menu)),
+                                 encoders.encode(menu).encode())
+            finally:
+                aio.reset()
+            self.assertEqual(aio.THRESHOLD, aio.DEFAULT_THRESHOLD)
+
+    def test_send_response(self):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(aio.send_response(send, Response(build_menu())))
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertFalse(messages[-1]['more_body'])
+        self.assertEqual(b''.join(m.get('body', b'') for m in messages),
+                         encoders.encode(Response(build_menu())).encode())
+
+
+def greeting_menu(name, balance=0):
+    return Response(Menu([MenuItem(f'Hello {name}', '/profile')],
+                         header=f'Balance: {balance}'))
+
+
+class TestBatch(unittest.TestCase):
+    params = [{'name': f'user{i}', 'balance': i} for i in range(25)]
+
+    def expected(self, backend=None):
+        return [greeting_menu(**p).as_json_bytes(backend=backend)
+                for p in self.params]
+
+    def test_inline(self):
+        self.assertEqual(list(batch.render_many(greeting_menu, self.params)),
+                         self.expected())
+        self.assertEqual(list(batch.render_many(greeting_menu, ['x'])),
+                         [greeting_menu('x').as_json_bytes()])
+
+    def test_process_pool(self):
+        payloads = batch.render_many(greeting_menu, iter(self.params),
+                                     processes=2, chunksize=4,
+                                     backend='json')
+        self.assertEqual(list(payloads), self.expected(backend='json'))
+
+        template = Template(greeting_menu(Placeholder('name'),
+                                          Placeholder('balance')))
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            payloads = batch.render_many(template, self.params,
+                                         executor=executor, chunksize=10)
+            self.assertEqual(list(payloads), self.expected(backend='json'))
+
+    def test_chunks_in_flight(self):
+        class Executor(concurrent.futures.ThreadPoolExecutor):
+            submitted = 0
+
+            def submit(self, *args, **kws):
+                self.submitted += 1
+                return super(Executor, self).submit(*args, **kws)
+
+        with Executor(2) as executor:
+            payloads = batch.render_many(greeting_menu, self.params,
+                                         executor=executor, processes=2,
+                                         chunksize=4)
+            # max_pending is 2 * processes, the generator doesn't run ahead
+            next(payloads)
+            self.assertEqual(executor.submitted, 4)
+            self.assertEqual(len([next(payloads) for _ in range(24)]), 24)
+            self.assertEqual(executor.submitted, 7)  # one per 4 params
+
+    def test_write_jsonl(self):
+        fp = io.BytesIO()
+        self.assertEqual(batch.write_jsonl(fp, greeting_menu, self.params,
+                                           processes=2, chunksize=3), 25)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [json.loads(p) for p in self.expected()])
+
+
+class TestCompact(unittest.TestCase):
+    def test_expand(self):
+        columns = Menu.from_columns(['A', 'B'], urls=['/a', None],
+                                    is_option=[True, False])
+        for obj in (build_form(), build_menu(), columns,
+                    build_form().freeze()):
+            response = Response(obj)
+            payload = response.as_json(compact=True)
+            full = compact.expand(json.loads(payload))
+
+            self.assertEqual(full, json.loads(json.dumps(response.as_data())))
+            self.assertEqual(json.dumps(full), encoders.encode(response))
+            self.assertEqual(response.as_json_bytes(compact=True),
+                             payload.encode())
+            self.assertLess(len(payload), len(response.as_json()))
+            schema.validate(full)
+
+        for item in build_form().items:
+            data = json.loads(item.as_json(compact=True))
+            self.assertEqual(compact.expand(data, 'form_item'),
+                             item.as_data())
+
+    def test_dropped_fields(self):
+        data = compact.as_data(build_form())
+
+        self.assertEqual(data['body'][0], {
+            'name': 'name', 'type': 'string', 'description': 'Name \u00e9',
+            'validation': {'min_length': 2, 'max_length_error': 'Too long'}})
+        self.assertEqual(data['body'][4], {
+            'name': 'date', 'type': 'date', 'header': 'When?'})
+        self.assertEqual(compact.as_data(MenuItem('Content', is_option=False)),
+                         {'description': 'Content', 'type': 'content'})
+        self.assertEqual(compact.as_data(MenuItem('Option', '/option')),
+                         {'description': 'Option', 'method': 'GET',
+                          'path': '/option'})
+
+    def test_menu_meta_defaults(self):
+        self.assertEqual(compact.compact(MenuMeta().as_data(), 'menu_meta'),
+                         {})
+        self.assertEqual(
+            compact.compact(MenuMeta(False).as_data(), 'menu_meta'),
+            {'auto_select': False})
+        for meta in (MenuMeta(), MenuMeta(False)):
+            response = Response(Menu([MenuItem('Only', '/only')], meta=meta))
+            full = compact.expand(json.loads(response.as_json(compact=True)))
+            self.assertEqual(full, response.as_data())
+
+
+class TestCompression(unittest.TestCase):
+    def test_compress(self):
+        response = Response(build_form())
+        payload = response.as_json_bytes()
+
+        body = response.as_json_compressed()
+        self.assertEqual(gzip.decompress(body), payload)
+        self.assertEqual(body, response.as_json_compressed())
+        self.assertEqual(zlib.decompress(
+            response.as_json_compressed('deflate')), payload)
+        self.assertEqual(compression.content_length(response, 'gzip'),
+                         len(body))
+        with self.assertRaises(Exception):
+            response.as_json_compressed('br')
+
+    def test_frozen_cache(self):
+        menu = build_menu().freeze()
+        body = compression.compress(menu, 'gzip')
+
+        self.assertIs(compression.compress(menu, 'gzip'), body)
+        self.assertEqual(set(menu._compressed), {('gzip', 6)})
+        self.assertEqual(gzip.decompress(body), menu.as_json_bytes())
+        self.assertFalse(hasattr(pickle.loads(pickle.dumps(menu)),
+                                 '_compressed'))
+
+    def test_negotiate(self):
+        negotiate = compression.negotiate
+
+        self.assertEqual(negotiate(None), 'identity')
+        self.assertEqual(negotiate('gzip, deflate, br'), 'gzip')
+        self.assertEqual(negotiate('deflate;q=1, gzip;q=0.5'), 'deflate')
+        self.assertEqual(negotiate('gzip;q=0, *'), 'deflate')
+        self.assertEqual(negotiate('br'), 'identity')
+
+        menu = build_menu()
+        encoding, body = compression.negotiate_payload(menu, 'deflate')
+        self.assertEqual(encoding, 'deflate')
+        self.assertEqual(zlib.decompress(body), menu.as_json_bytes())
+        self.assertEqual(compression.negotiate_payload(menu, ''),
+                         ('identity', menu.as_json_bytes()))
+
+
+class TestCBOR(unittest.TestCase):
+    def test_values(self):
+        # RFC 8949 appendix A examples
+        examples = [
+            (0, '00'), (23, '17'), (24, '1818'), (1000, '1903e8'),
+            (1000000, '1a000f4240'), (-1, '20'), (-1000, '3903e7'),
+            (18446744073709551616, 'c249010000000000000000'),
+            (1.1, 'fb3ff199999999999a'), (False, 'f4'), (True, 'f5'),
+            (None, 'f6'), ('', '60'), ('a', '6161'),
+            ('\u00fc', '62c3bc'), ([1, [2, 3]], '8201820203'),
+            ({'a': 1, 'b': [2, 3]}, 'a26161016162820203'),
+            (b'\x01\x02', '420102'),
+        ]
+        for value, encoded in examples:
+            self.assertEqual(cbor.py_dumps(value).hex(), encoded)
+            self.assertEqual(cbor.py_loads(bytes.fromhex(encoded)), value)
+
+        self.assertEqual(cbor.py_loads(bytes.fromhex('f93e00')), 1.5)
+        self.assertEqual(cbor.py_dumps(list(range(30)))[:2].hex(), '981e')
+        for invalid in ('62c3', '8201', '0000', '7f'):
+            with self.assertRaises(cbor.CBORError):
+                cbor.py_loads(bytes.fromhex(invalid))
+        with self.assertRaises(cbor.CBORError):
+            cbor.py_dumps({1, 2})
+
+    def test_round_trip(self):
+        for obj in (Response(build_form()), Response(build_menu())):
+            data = obj.as_cbor()
+
+            self.assertLess(len(data), len(obj.as_json_bytes()))
+            self.assertEqual(cbor.loads(data), obj.as_data())
+            self.assertEqual(cbor.py_loads(cbor.py_dumps(obj.as_data())),
+                             obj.as_data())
+            self.assertEqual(Response.from_cbor(data).as_data(),
+                             obj.as_data())
+            self.assertEqual(
+                Response.from_cbor(data, trusted=True).as_data(),
+                obj.as_data())
+
+        item = build_form().items[2]
+        self.assertEqual(forms.BaseFormItem.from_cbor(item.as_cbor())
+                         .as_data(), item.as_data())
+
+
+class TestFlyweight(unittest.TestCase):
+    def test_items(self):
+        registry = flyweight.Registry()
+        back = registry.item(MenuItem, 'Back', '/back')
+
+        self.assertTrue(frozen.is_frozen(back))
+        self.assertEqual(back._json, json.dumps(back.as_data()))
+        self.assertIs(registry.item(MenuItem, 'Back', '/back'), back)
+        self.assertIsNot(registry.item(MenuItem, 'Back', '/back',
+                                       method='POST'), back)
+        self.assertIsNot(registry.item(forms.MenuItemFormItem, 'Yes', 1),
+                         registry.item(forms.MenuItemFormItem, 'Yes', True))
+        self.assertIsNot(registry.item(forms.MenuItemFormItem, 'A', [1]),
+                         registry.item(forms.MenuItemFormItem, 'A', [1]))
+
+        stats = registry.stats.as_dict()
+        self.assertEqual(stats['objects'], 4)
+        self.assertEqual(stats['objects_deduplicated'], 1)
+        self.assertGreater(stats['bytes_deduplicated'], 0)
+
+        menu = Menu([MenuItem('First', '/first'), back])
+        self.assertEqual(encoders.encode(menu), json.dumps(menu.as_data()))
+
+    def test_nested_types(self):
+        registry = flyweight.Registry()
+        for values in (((1,), (True,)), ((0.0,), (-0.0,)),
+                       (((1, 2),), ((1.0, 2),))):
+            items = [registry.item(forms.MenuItemFormItem, 'A', value)
+                     for value in values]
+            self.assertIsNot(items[0], items[1])
+            for item, value in zip(items, values):
+                self.assertEqual(encoders.encode(item),
+                                 forms.MenuItemFormItem('A', value).as_json())
+        self.assertIs(registry.item(forms.MenuItemFormItem, 'A', (1,)),
+                      registry.item(forms.MenuItemFormItem, 'A', (1,)))
+
+    def test_strings(self):
+        registry = flyweight.Registry(max_size=1)
+        footer = ''.join(['Reply with', ' a number'])
+
+        self.assertIs(registry.intern(footer), footer)
+        copy = ''.join(['Reply with a', ' number'])
+        self.assertIsNot(copy, footer)
+        self.assertIs(registry.intern(copy), footer)
+        self.assertIsNone(registry.intern(None))
+
+        other = registry.intern('not kept')
+        self.assertEqual(registry.stats.strings, 1)
+        self.assertEqual(registry.stats.strings_deduplicated, 1)
+        self.assertEqual(other, 'not kept')
+
+
+class TestSimulator(unittest.TestCase):
+    def serve(self, requests):
+        pages = {
+            '/': Response(Menu([
+                MenuItem('Intro', is_option=False),
+                MenuItem('Register', '/form'),
+            ])),
+            '/form': Response(forms.Form([
+                forms.StringFormItem('name', min_length=6),
+                forms.IntFormItem('age', min_value=18, max_value=20),
+                forms.HiddenFormItem('source', 'sim'),
+                forms.MenuFormItem('color', [
+                    forms.MenuItemFormItem('Red', 'red'),
+                ]),
+            ], '/done', method='POST')),
+            '/done': Response(Menu([MenuItem('Bye', is_option=False)])),
+        }
+
+        async def handle(reader, writer):
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode().split(' ')
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header == b'\r\n':
+                        break
+                    name, _, value = header.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                body = await reader.readexactly(length)
+                requests.append((method, path, body))
+
+                page = pages.get(path)
+                data = page.as_json_bytes() if page else b'{}'
+                status = '200 OK' if page else '404 Not Found'
+                writer.write(f'HTTP/1.1 {status}\r\n'
+                             f'Content-Length: {len(data)}\r\n\r\n'
+                             .encode() + data)
+                await writer.drain()
+            writer.close()
+
+        return asyncio.start_server(handle, '127.0.0.1', 0)
+
+    def test_sessions(self):
+        requests = []
+
+        async def main():
+            server = await self.serve(requests)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await simulator.run(f'http://127.0.0.1:{port}/',
+                                           sessions=20, concurrency=5,
+                                           seed=1)
+
+        report = asyncio.run(main())
+        data = report.as_dict()
+
+        self.assertEqual(data['sessions'], 20)
+        self.assertEqual(data['requests'], 60)
+        self.assertEqual(set(data['paths']), {'/', '/form', '/done'})
+        self.assertEqual(data['paths']['/done']['errors'], 0)
+        self.assertGreater(report.throughput, 0)
+        self.assertIn('/form', report.format())
+
+        posts = [r for r in requests if r[0] == 'POST']
+        self.assertEqual(len(posts), 20)
+        method, path, body = posts[0]
+        answers = json.loads(body)
+        self.assertEqual(path, '/done')
+        self.assertGreaterEqual(len(answers['name']), 6)
+        self.assertIn(int(answers['age']), (18, 19, 20))
+        self.assertEqual(answers['source'], 'sim')
+        self.assertEqual(answers['color'], 'red')
+
+    def test_errors_dont_stop_the_run(self):
+        menu = Response(Menu([MenuItem(path, path) for path in
+                              ('/list', '/broken', '/missing')]))
+        raw = {
+            '/': b'HTTP/1.1 200 OK\r\n', '/list': b'HTTP/1.1 200 OK\r\n',
+            '/missing': b'HTTP/1.1 200 OK\r\n', '/broken': b'garbage\r\n'}
+        data = {'/': menu.as_json_bytes(), '/list': b'[1]',
+                '/missing': b'{"type": "menu"}', '/broken': b''}
+
+        async def handle(reader, writer):
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                path = line.decode().split(' ')[1]
+                while await reader.readline() != b'\r\n':
+                    pass
+                writer.write(raw[path] + f'Content-Length: '
+                             f'{len(data[path])}\r\n\r\n'.encode()
+                             + data[path])
+                await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await simulator.run(f'http://127.0.0.1:{port}/',
+                                           sessions=30, concurrency=3,
+                                           seed=2)
+
+        report = asyncio.run(main())
+        data = report.as_dict()
+        self.assertEqual(data['sessions'], 30)
+        self.assertEqual(data['paths']['/']['errors'], 0)
+        for path in ('/list', '/broken'):
+            self.assertEqual(data['paths'][path]['errors'],
+                             data['paths'][path]['requests'])
+        self.assertEqual(data['failures'],
+                         {'KeyError': data['paths']['/missing']['requests']})
+        self.assertIn('failed sessions: KeyError', report.format())
+
+    def test_answer_ranges(self):
+        rng = random.Random(0)
+        INT, FLOAT = forms.FormItemType.INT, forms.FormItemType.FLOAT
+        cases = [
+            ({'max_value': -5}, INT, -5, -5),
+            ({'max_value': 5}, INT, 0, 5),
+            ({'min_value': 10, 'max_value': 5}, INT, 10, 10),
+            ({'min_value': 1.5, 'max_value': 3.5}, INT, 2, 3),
+            ({'max_value': -5.5}, FLOAT, -5.5, -5.5),
+            ({'min_value': 1.234, 'max_value': 1.236}, FLOAT, 1.234, 1.236),
+        ]
+        for validation, item_type, low, high in cases:
+            item = {'type': item_type, 'validation': validation}
+            for _ in range(20):
+                value = float(simulator.answer(item, rng))
+                self.assertTrue(low <= value <= high, (validation, value))
+
+        item = {'type': forms.FormItemType.STRING,
+                'validation': {'min_length': 6, 'max_length': 3}}
+        self.assertEqual(len(simulator.answer(item, rng)), 3)
+
+    def test_percentiles(self):
+        report = simulator.Report()
+        for i in range(1, 101):
+            report.record('/', i / 1000, error='x' if i == 1 else None)
+
+        stats = report.as_dict()['paths']['/']
+        self.assertEqual((stats['p50'], stats['p90'], stats['p99']),
+                         (0.05, 0.09, 0.099))
+        self.assertEqual(stats['errors'], 1)
+
+
+class TestRendering(unittest.TestCase):
+    def test_encoding(self):
+        self.assertEqual(rendering.encoding('Hello @ 10\u00a3'),
+                         rendering.GSM7)
+        self.assertEqual(rendering.encoding('Price \u20ac5 [x]'),
+                         rendering.GSM7)
+        self.assertEqual(rendering.length('Price \u20ac5 [x]'), 15)
+        self.assertEqual(rendering.encoding('First \u2713'), rendering.UCS2)
+        self.assertEqual(rendering.length('\U0001f600'), 2)
+
+    def test_segments(self):
+        self.assertEqual(rendering.segments('a' * 160), 1)
+        self.assertEqual(rendering.segments('a' * 161), 2)
+        self.assertEqual(rendering.segments('a' * 306), 2)
+        self.assertEqual(rendering.segments('a' * 307), 3)
+        self.assertEqual(rendering.segments('\u2713' * 70), 1)
+        self.assertEqual(rendering.segments('\u2713' * 71), 2)
+
+        # the escaped euro sign doesn't straddle two segments
+        parts = rendering.split_sms('a' * 152 + '\u20ac' + 'b' * 10)
+        self.assertEqual([len(p) for p in parts], [152, 11])
+        self.assertEqual(rendering.segments('a' * 152 + '\u20ac' + 'b' * 152),
+                         3)
+
+    def test_render(self):
+        self.assertEqual(rendering.render(Response(build_menu())).lines, [
+            'header', 'A First \u2713', 'B Second', 'Content'])
+
+        steps = rendering.render(build_form())
+        self.assertEqual(len(steps), 6)
+        self.assertEqual(steps[0].lines, ['header', 'Name \u00e9', 'footer'])
+        self.assertEqual(steps[3].lines, ['When?', 'footer'])
+        self.assertEqual(steps[-1].lines, [
+            'header', '1 Yes', 'Content "quoted"', '2 No', 'footer'])
+
+        self.assertEqual([rendering.marker(i) for i in (0, 25, 26, 27)],
+                         ['A', 'Z', 'AA', 'AB'])
+        columns = Menu.from_columns(['x', 'y'], urls=['/x', '/y'])
+        self.assertEqual(rendering.render(columns).lines, ['A x', 'B y'])
+
+    def test_pages_and_trim(self):
+        menu = Menu([MenuItem(f'Product number {i}', f'/p/{i}')
+                     for i in range(40)],
+                    header='Products', footer='Reply with a letter')
+        text = rendering.render(menu)
+
+        self.assertEqual(text.segments, 6)
+        pages = text.pages()
+        self.assertEqual(len(pages), 6)
+        for page in pages[:-1]:
+            self.assertLessEqual(len(page), 182)
+            self.assertTrue(page.startswith('Products\n'))
+            self.assertTrue(page.endswith('\n' + rendering.CHUNKING_FOOTER))
+        self.assertTrue(pages[-1].endswith('AN Product number 39\n'
+                                           'Reply with a letter'))
+        self.assertEqual(rendering.Rendering(['a'], footer='b').pages(),
+                         ['a\nb'])
+
+        trimmed = rendering.trim(menu)
+        self.assertEqual(len(trimmed.body), 6)
+        self.assertTrue(rendering.render(trimmed).fits())
+        self.assertFalse(rendering.render(
+            Menu(menu.body[:7], header='Products',
+                 footer='Reply with a letter')).fits())
+        self.assertEqual(len(menu.body), 40)
+        self.assertIs(rendering.trim(trimmed), trimmed)
+
+    def test_split_lines(self):
+        pages = rendering.Rendering(['\u20ac' * 100]).pages()
+        self.assertEqual(pages, ['\u20ac' * 81 + '\n' +
+                                 rendering.CHUNKING_FOOTER, '\u20ac' * 19])
+
+        pages = rendering.Rendering(['short', 'y' * 300]).pages()
+        self.assertEqual(pages, ['short\n' + 'y' * 156 + '\n' +
+                                 rendering.CHUNKING_FOOTER, 'y' * 144])
+
+        body = ['\u20ac' * 100, 'z' * 400, 'end']
+        pages = rendering.Rendering(body, header='h', footer='f').pages()
+        for page in pages:
+            self.assertLessEqual(rendering.length(page), 182)
+            self.assertTrue(page.startswith('h\n'))
+        for page in pages[:-1]:
+            self.assertTrue(page.endswith('\n' + rendering.CHUNKING_FOOTER))
+        self.assertTrue(pages[-1].endswith('\nend\nf'))
+        text = ''.join(page[2:].replace('\n' + rendering.CHUNKING_FOOTER, '')
+                       for page in pages)
+        self.assertEqual(text.replace('\n', ''), ''.join(body) + 'f')
+
+        # the footer alone is left for the last page
+        pages = rendering.Rendering(['a' * 150], footer='f' * 100).pages()
+        self.assertEqual(pages, ['a' * 150 + '\n' + rendering.CHUNKING_FOOTER,
+                                 'f' * 100])
+
 if __name__ == '__main__':
     unittest.main()
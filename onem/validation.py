@@ -0,0 +1,218 @@
+"""
+In-process validation of user input against the rules declared on the form
+items, returning the same ``{'valid': ..., 'error': ...}`` structure the
+``validate_url`` callbacks are expected to return::
+
+    validator = FormValidator(form)
+    validator.validate('age', '11')
+    # {'valid': False, 'error': 'You are too young to join our program'}
+
+Only the declared rules are checked (type, length, value range and menu
+option values). Items with a ``validate_url`` may need further checks, their
+names are listed in ``FormValidator.callbacks``.
+"""
+import datetime
+import math
+
+from onem import forms
+
+
+TYPE_ERROR = 'Invalid value.'
+REQUIRED_ERROR = 'This value is required.'
+MIN_LENGTH_ERROR = 'Value is too short.'
+MAX_LENGTH_ERROR = 'Value is too long.'
+MIN_VALUE_ERROR = 'Value is too small.'
+MAX_VALUE_ERROR = 'Value is too big.'
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S',
+                    '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S',
+                    '%d/%m/%Y %H:%M')
+
+
+class ValidationError(Exception):
+    def __init__(self, errors):
+        """
+        :param errors: dict of item name to error message
+        """
+        super(ValidationError, self).__init__(errors)
+        self.errors = errors
+
+
+def _strptime(formats, to_date):
+    def parse(value):
+        for fmt in formats:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            return parsed.date() if to_date else parsed
+        raise ValueError(value)
+    return parse
+
+
+def _string_check(item):
+    min_length = item.min_length
+    max_length = item.max_length
+    min_error = item.min_length_error or MIN_LENGTH_ERROR
+    max_error = item.max_length_error or MAX_LENGTH_ERROR
+
+    def check(value):
+        if min_length is not None and len(value) < min_length:
+            return value, min_error
+        if max_length is not None and len(value) > max_length:
+            return value, max_error
+        return value, None
+    return check
+
+
+def _number_check(item, convert):
+    min_value = item.min_value
+    max_value = item.max_value
+    min_error = item.min_value_error or MIN_VALUE_ERROR
+    max_error = item.max_value_error or MAX_VALUE_ERROR
+    type_error = item.validate_type_error or TYPE_ERROR
+
+    def check(value):
+        # int() and float() accept '1_000', 'nan' and 'inf'
+        if '_' in value:
+            return None, type_error
+        try:
+            value = convert(value)
+        except ValueError:
+            return None, type_error
+        if not math.isfinite(value):
+            return None, type_error
+        if min_value is not None and value < min_value:
+            return value, min_error
+        if max_value is not None and value > max_value:
+            return value, max_error
+        return value, None
+    return check
+
+
+def _convert_check(item, convert):
+    type_error = item.validate_type_error or TYPE_ERROR
+
+    def check(value):
+        try:
+            return convert(value), None
+        except ValueError:
+            return None, type_error
+    return check
+
+
+def _menu_check(item, multi_select_sep=','):
+    values = {str(option.value): option.value
+              for option in item.body if option.is_option}
+    multi_select = item.meta is not None and item.meta.multi_select
+    type_error = item.validate_type_error or TYPE_ERROR
+
+    def check(value):
+        if not multi_select:
+            if value not in values:
+                return None, type_error
+            return values[value], None
+
+        chosen = [v.strip() for v in value.split(multi_select_sep)]
+        if not all(v in values for v in chosen):
+            return None, type_error
+        return [values[v] for v in chosen], None
+    return check
+
+
+def compile_item(item, date_formats=DATE_FORMATS,
+                 datetime_formats=DATETIME_FORMATS):
+    """
+    Returns a function taking the raw user input of ``item`` and returning
+    the ``(value, error)`` tuple where value is the coerced input and error
+    is None when the input is valid
+    """
+    if isinstance(item, forms.HiddenFormItem):
+        hidden_value = item.value
+        return lambda value: (hidden_value, None)
+
+    if isinstance(item, forms.StringFormItem):
+        check = _string_check(item)
+    elif isinstance(item, forms.FloatFormItem):
+        check = _number_check(item, float)
+    elif isinstance(item, forms.IntFormItem):
+        check = _number_check(item, int)
+    elif isinstance(item, forms.DateFormItem):
+        check = _convert_check(item, _strptime(date_formats, to_date=True))
+    elif isinstance(item, forms.DateTimeFormItem):
+        check = _convert_check(item, _strptime(datetime_formats,
+                                               to_date=False))
+    elif isinstance(item, forms.MenuFormItem):
+        check = _menu_check(item)
+    else:
+        raise Exception(f'Unsupported form item: {item.__class__.__name__}')
+
+    required = item.required
+
+    def validate(value):
+        value = '' if value is None else str(value).strip()
+        if not value:
+            return None, (REQUIRED_ERROR if required else None)
+        return check(value)
+
+    return validate
+
+
+class FormValidator(object):
+    def __init__(self, form, date_formats=DATE_FORMATS,
+                 datetime_formats=DATETIME_FORMATS):
+        """
+        :param form: Form instance or sequence of form items
+        :param date_formats: ``strptime`` formats accepted for date items
+        :param datetime_formats: ``strptime`` formats accepted for datetime
+            items
+        """
+        items = form.items if isinstance(form, forms.Form) else form
+
+        self.validators = {
+            item.name: compile_item(item, date_formats=date_formats,
+                                    datetime_formats=datetime_formats)
+            for item in items
+        }
+        # items whose validate_url may check more than the declared rules
+        self.callbacks = [item.name for item in items if item.validate_url]
+
+    def validate(self, name, user_input):
+        """
+        Returns ``{'valid': True/False, 'error': 'error message or None'}``
+        for the ``user_input`` of the item called ``name``
+        """
+        try:
+            validate = self.validators[name]
+        except KeyError:
+            raise Exception(f'Unknown form item: {name}')
+        error = validate(user_input)[1]
+        return {'valid': error is None, 'error': error}
+
+    def validate_many(self, inputs):
+        """
+        Returns a dict of item name to ``validate`` result for every item
+        in the ``inputs`` dict of item name to user input
+        """
+        return {name: self.validate(name, user_input)
+                for name, user_input in inputs.items()}
+
+    def clean(self, inputs):
+        """
+        Returns the dict of coerced values of ``inputs`` (dict of item name to
+        user input), items missing from ``inputs`` are checked as empty.
+        Raises ValidationError holding every error if any input is invalid.
+        """
+        values = {}
+        errors = {}
+        for name, validate in self.validators.items():
+            value, error = validate(inputs.get(name))
+            if error is not None:
+                errors[name] = error
+            else:
+                values[name] = value
+
+        if errors:
+            raise ValidationError(errors)
+        return values